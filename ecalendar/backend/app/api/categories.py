@@ -1,31 +1,50 @@
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
-from ..db import get_db
+from ..changes import record
+from ..db import get_db, get_read_db
+from ..db.crud import insert_row, delete_row
 from ..models import Category
 from ..schemas import CategoryCreate, CategoryRead
+from ..serialize import RowsResponse, as_dicts, read_columns
+from .conditional import Delta, delta, etag, watermark
 
 router = APIRouter(prefix="/api/categories", tags=["categories"])
 
 
-@router.get("", response_model=list[CategoryRead])
-async def list_categories(db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(Category).order_by(Category.name))
-    return [CategoryRead.model_validate(c) for c in r.scalars().all()]
+@router.get("", response_model=list[CategoryRead] | Delta[CategoryRead], response_class=RowsResponse)
+async def list_categories(
+    updated_since: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    headers: dict = Depends(etag("categories")),
+):
+    return RowsResponse(await query_categories(db, updated_since), headers=headers)
+
+
+async def query_categories(db: AsyncSession, updated_since: datetime | None = None) -> list[dict] | dict:
+    q = select(*read_columns(Category, CategoryRead)).order_by(Category.name)
+    if updated_since is not None:
+        since, mark = watermark(updated_since)
+        q = q.where(Category.updated_at > since)
+    r = await db.execute(q)
+    cats = as_dicts(r.all())
+    if updated_since is None:
+        return cats
+    return await delta(db, Category, since, mark, cats)
 
 
 @router.post("", response_model=CategoryRead, status_code=201)
 async def create_category(schema: CategoryCreate, db: AsyncSession = Depends(get_db)):
-    cat = Category(**schema.model_dump())
-    db.add(cat)
-    await db.flush()
-    await db.refresh(cat)
-    return CategoryRead.model_validate(cat)
+    cat = CategoryRead.model_validate(await insert_row(db, Category, schema.model_dump()))
+    record(db, "categories", "upsert", rows=[cat])
+    return cat
 
 
 @router.get("/{cat_id}", response_model=CategoryRead)
-async def get_category(cat_id: int, db: AsyncSession = Depends(get_db)):
+async def get_category(cat_id: int, db: AsyncSession = Depends(get_read_db)):
     r = await db.execute(select(Category).where(Category.id == cat_id))
     cat = r.scalar_one_or_none()
     if not cat:
@@ -35,9 +54,7 @@ async def get_category(cat_id: int, db: AsyncSession = Depends(get_db)):
 
 @router.delete("/{cat_id}", status_code=204)
 async def delete_category(cat_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(Category).where(Category.id == cat_id))
-    cat = r.scalar_one_or_none()
-    if not cat:
+    if not await delete_row(db, Category, cat_id):
         raise HTTPException(404, "Category not found")
-    await db.delete(cat)
+    record(db, "categories", "delete", ids=[cat_id])
     return None
@@ -0,0 +1,50 @@
+"""Live change feed - server-sent events."""
+import asyncio
+import json
+
+from fastapi import APIRouter, Header
+from fastapi.responses import StreamingResponse
+
+from ..changes import change_feed
+
+router = APIRouter(prefix="/api/changes", tags=["changes"])
+
+# Streams are closed after this long; EventSource reconnects and resumes
+# from Last-Event-ID, so nothing is missed
+MAX_STREAM_SECONDS = 600
+KEEPALIVE_SECONDS = 15
+
+
+def _parse_id(value: str | None) -> tuple[str | None, int | None]:
+    epoch, _, seq = (value or "").partition(":")
+    if not seq.isdigit():
+        return None, None
+    return epoch, int(seq)
+
+
+@router.get("")
+async def stream_changes(since: str | None = None, last_event_id: str | None = Header(None)):
+    """Server-sent events with one delta per change (see app.changes).
+
+    Each event's id is ``epoch:seq``; pass the last one back as ``since``
+    (or let EventSource send Last-Event-ID) to resume.
+    """
+    epoch, seq = _parse_id(last_event_id or since)
+
+    async def events():
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + MAX_STREAM_SECONDS
+        yield "retry: 3000\n\n"
+        async for change in change_feed.stream(epoch, seq, idle=KEEPALIVE_SECONDS):
+            if change is None:
+                yield ": keepalive\n\n"
+            else:
+                yield f"id: {change_feed.epoch}:{change['seq']}\ndata: {json.dumps(change)}\n\n"
+            if loop.time() > deadline:
+                return
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
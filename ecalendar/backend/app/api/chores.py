@@ -1,46 +1,154 @@
 from __future__ import annotations
 
-from datetime import date
+from datetime import date, datetime
+from operator import itemgetter
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import and_, case, or_, select
 
-from ..db import get_db
+from ..changes import record
+from ..config import settings
+from ..db import get_read_db, write_queue
+from ..db.crud import insert_row, update_row, update_many, delete_row, delete_rows
 from ..models import Chore
-from ..schemas import ChoreCreate, ChoreUpdate, ChoreRead
+from ..schemas import ChoreCreate, ChoreUpdate, ChoreBulkComplete, ChoreBulkDelete, ChoreRead
+from ..serialize import RowsResponse, as_dicts, read_columns
+from .conditional import Delta, delta, etag, watermark
+from .pagination import MAX_PAGE, decode_cursor, split_page
 
 router = APIRouter(prefix="/api/chores", tags=["chores"])
 
 
-@router.get("", response_model=list[ChoreRead])
+@router.get("", response_model=list[ChoreRead] | Delta[ChoreRead], response_class=RowsResponse)
 async def list_chores(
     completed: bool | None = None,
     due_before: date | None = None,
     assignee: str | None = None,
-    db: AsyncSession = Depends(get_db),
+    updated_since: datetime | None = None,
+    limit: int = Query(settings.page_size, ge=1, le=MAX_PAGE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    headers: dict = Depends(etag("chores")),
 ):
-    q = select(Chore).order_by(Chore.due_date.asc().nullslast(), Chore.created_at.desc())
+    """Chores by due date (undated last), newest first on the same day.
+
+    Results come in pages of ``limit``, with the cursor of the next page in
+    the X-Next-Cursor header; a delta (``updated_since``) comes whole.
+    """
+    if updated_since is not None:
+        return RowsResponse(await query_chores(db, completed, due_before, assignee, updated_since), headers=headers)
+    after = decode_cursor(cursor, date, datetime, int) if cursor else None
+    chores = await query_chores(db, completed, due_before, assignee, after=after, limit=limit + 1)
+    chores, more = split_page(chores, limit, itemgetter("due_date", "created_at", "id"))
+    return RowsResponse(chores, headers={**headers, **more})
+
+
+# Order within a due date, and of undated chores
+_NEWEST = (Chore.created_at.desc(), Chore.id.desc())
+
+
+def _older(created_at: datetime, chore_id: int):
+    return or_(Chore.created_at < created_at, and_(Chore.created_at == created_at, Chore.id < chore_id))
+
+
+async def query_chores(
+    db: AsyncSession,
+    completed: bool | None = None,
+    due_before: date | None = None,
+    assignee: str | None = None,
+    updated_since: datetime | None = None,
+    after: tuple[date | None, datetime, int] | None = None,
+    limit: int | None = None,
+) -> list[dict] | dict:
+    """Chores as ChoreRead-shaped dicts, or a delta with ``updated_since``.
+
+    ``after`` and ``limit`` select a page. Dated chores are read along the
+    (due_date, created_at, id) index first and undated ones after them, so
+    a page is at most two index ranges.
+    """
+    q = select(*read_columns(Chore, ChoreRead))
     if completed is not None:
         q = q.where(Chore.completed == completed)
     if due_before:
         q = q.where(Chore.due_date <= due_before)
     if assignee:
         q = q.where(Chore.assignee == assignee)
-    r = await db.execute(q)
-    return [ChoreRead.model_validate(c) for c in r.scalars().all()]
+    if updated_since is not None:
+        since, mark = watermark(updated_since)
+        q = q.where(Chore.updated_at > since)
+    if limit is None:
+        r = await db.execute(q.order_by(Chore.due_date.asc().nullslast(), *_NEWEST))
+        chores = as_dicts(r.all())
+        if updated_since is None:
+            return chores
+        return await delta(db, Chore, since, mark, chores)
+    chores = []
+    if after is None or after[0] is not None:
+        dated = q.where(Chore.due_date.is_not(None)).order_by(Chore.due_date, *_NEWEST)
+        if after is not None:
+            due, created_at, chore_id = after
+            dated = dated.where(Chore.due_date >= due, or_(Chore.due_date > due, _older(created_at, chore_id)))
+        r = await db.execute(dated.limit(limit))
+        chores = as_dicts(r.all())
+    if len(chores) < limit:
+        undated = q.where(Chore.due_date.is_(None)).order_by(*_NEWEST)
+        if after is not None and after[0] is None:
+            undated = undated.where(_older(after[1], after[2]))
+        r = await db.execute(undated.limit(limit - len(chores)))
+        chores += as_dicts(r.all())
+    return chores
 
 
 @router.post("", response_model=ChoreRead, status_code=201)
-async def create_chore(schema: ChoreCreate, db: AsyncSession = Depends(get_db)):
-    chore = Chore(**schema.model_dump())
-    db.add(chore)
-    await db.flush()
-    await db.refresh(chore)
-    return ChoreRead.model_validate(chore)
+async def create_chore(schema: ChoreCreate):
+    async def write(db: AsyncSession):
+        chore = ChoreRead.model_validate(await insert_row(db, Chore, schema.model_dump()))
+        record(db, "chores", "upsert", rows=[chore])
+        return chore
+
+    return await write_queue.run(write)
+
+
+def _completion(completed: bool) -> dict:
+    if not completed:
+        return {"completed": False, "completed_at": None}
+    # Keep the original completion time if it was already done
+    return {
+        "completed": True,
+        "completed_at": case((Chore.completed.is_(True), Chore.completed_at), else_=datetime.utcnow()),
+    }
+
+
+@router.post("/bulk/complete", response_model=list[ChoreRead])
+async def complete_chores(schema: ChoreBulkComplete):
+    """Mark several chores done (or not) in one transaction; 404 if any is missing."""
+    ids = list(dict.fromkeys(schema.ids))
+
+    async def write(db: AsyncSession):
+        rows = {row.id: row for row in await update_many(db, Chore, ids, _completion(schema.completed))}
+        if len(rows) != len(ids):
+            raise HTTPException(404, "Chore not found")
+        chores = [ChoreRead.model_validate(rows[i]) for i in ids]
+        record(db, "chores", "upsert", rows=chores)
+        return chores
+
+    return await write_queue.run(write)
+
+
+@router.post("/bulk/delete")
+async def delete_chores(schema: ChoreBulkDelete):
+    """Delete several chores in one transaction; ids already gone are ignored."""
+    async def write(db: AsyncSession):
+        deleted = await delete_rows(db, Chore, schema.ids)
+        if deleted:
+            record(db, "chores", "delete", ids=list(dict.fromkeys(schema.ids)))
+        return {"deleted": deleted}
+
+    return await write_queue.run(write)
 
 
 @router.get("/{chore_id}", response_model=ChoreRead)
-async def get_chore(chore_id: int, db: AsyncSession = Depends(get_db)):
+async def get_chore(chore_id: int, db: AsyncSession = Depends(get_read_db)):
     r = await db.execute(select(Chore).where(Chore.id == chore_id))
     chore = r.scalar_one_or_none()
     if not chore:
@@ -49,31 +157,27 @@ async def get_chore(chore_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.patch("/{chore_id}", response_model=ChoreRead)
-async def update_chore(
-    chore_id: int, schema: ChoreUpdate, db: AsyncSession = Depends(get_db)
-):
-    r = await db.execute(select(Chore).where(Chore.id == chore_id))
-    chore = r.scalar_one_or_none()
-    if not chore:
-        raise HTTPException(404, "Chore not found")
-    data = schema.model_dump(exclude_unset=True)
-    if data.get("completed") and not chore.completed:
-        from datetime import datetime
-        data["completed_at"] = datetime.utcnow()
-    elif data.get("completed") is False:
-        data["completed_at"] = None
-    for k, v in data.items():
-        setattr(chore, k, v)
-    await db.flush()
-    await db.refresh(chore)
-    return ChoreRead.model_validate(chore)
+async def update_chore(chore_id: int, schema: ChoreUpdate):
+    async def write(db: AsyncSession):
+        data = schema.model_dump(exclude_unset=True)
+        if data.get("completed") is not None:
+            data.update(_completion(data["completed"]))
+        chore = await update_row(db, Chore, chore_id, data)
+        if not chore:
+            raise HTTPException(404, "Chore not found")
+        chore = ChoreRead.model_validate(chore)
+        record(db, "chores", "upsert", rows=[chore])
+        return chore
+
+    return await write_queue.run(write)
 
 
 @router.delete("/{chore_id}", status_code=204)
-async def delete_chore(chore_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(Chore).where(Chore.id == chore_id))
-    chore = r.scalar_one_or_none()
-    if not chore:
-        raise HTTPException(404, "Chore not found")
-    await db.delete(chore)
-    return None
+async def delete_chore(chore_id: int):
+    async def write(db: AsyncSession):
+        if not await delete_row(db, Chore, chore_id):
+            raise HTTPException(404, "Chore not found")
+        record(db, "chores", "delete", ids=[chore_id])
+        return None
+
+    return await write_queue.run(write)
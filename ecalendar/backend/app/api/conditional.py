@@ -0,0 +1,75 @@
+"""Conditional GETs and delta queries for the list endpoints.
+
+A list's ETag is the change feed's version of the tables it reads (the
+seq of their last committed change) in this process, so an unchanged
+poll is answered with 304 before any query runs. ``updated_since``
+returns only rows changed after a watermark, plus the ids to drop
+(deleted since, from tombstones, or changed so they no longer match),
+and a new watermark to pass next time.
+"""
+from datetime import datetime, timedelta
+from typing import Generic, TypeVar
+
+from fastapi import Header, HTTPException
+from pydantic import BaseModel
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..changes import change_feed
+from ..config import settings
+from ..models import Tombstone
+from ..recurrence import naive_utc
+
+# Rows are stamped before their transaction commits; the watermark trails
+# the clock by this much so a write committing during the query is not
+# skipped next time (it may be sent twice instead)
+WATERMARK_LAG = timedelta(seconds=5)
+
+T = TypeVar("T")
+
+
+class Delta(BaseModel, Generic[T]):
+    rows: list[T]
+    deleted: list[int]
+    # Pass as updated_since on the next call
+    watermark: datetime
+
+
+def etag(*tables: str):
+    """Route dependency giving the caching headers for ``tables``; 304 if
+    the client's ETag is current."""
+    async def check(if_none_match: str | None = Header(None)) -> dict[str, str]:
+        tag = f'W/"{change_feed.epoch}.{change_feed.version(*tables)}"'
+        headers = {"ETag": tag, "Cache-Control": "no-cache"}
+        if if_none_match and (if_none_match.strip() == "*" or tag in [t.strip() for t in if_none_match.split(",")]):
+            raise HTTPException(304, headers=headers)
+        return headers
+
+    return check
+
+
+def watermark(since: datetime) -> tuple[datetime, datetime]:
+    """(since as naive UTC, the next watermark); 410 if deletions since then are forgotten."""
+    since = naive_utc(since)
+    now = datetime.utcnow()
+    if since < now - timedelta(days=settings.tombstone_days):
+        raise HTTPException(410, "updated_since is older than the kept deletions; fetch the full list")
+    return since, now - WATERMARK_LAG
+
+
+async def delta(db: AsyncSession, model, since: datetime, mark: datetime, rows: list[dict], *where) -> dict:
+    """Wrap changed ``rows`` with the ids the client should drop, shaped
+    like ``Delta``.
+
+    Those are rows deleted after ``since`` and rows changed since that no
+    longer match the query (e.g. a chore completed under completed=false);
+    ``where`` scopes the latter like the query was scoped.
+    """
+    r = await db.execute(
+        select(Tombstone.row_id).where(Tombstone.table_name == model.__tablename__, Tombstone.deleted_at > since)
+    )
+    drop = set(r.scalars().all())
+    r = await db.execute(select(model.id).where(model.updated_at > since, *where))
+    drop.update(r.scalars().all())
+    drop -= {row["id"] for row in rows}
+    return {"rows": rows, "deleted": sorted(drop), "watermark": mark}
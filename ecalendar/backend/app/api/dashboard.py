@@ -0,0 +1,80 @@
+"""Everything the planner shows on load, in one request.
+
+The database reads run concurrently, each on its own read-only connection,
+while the weather is fetched; with ``db_wal`` off there is only one
+connection, so they run in turn on it instead.
+"""
+import asyncio
+import logging
+from datetime import datetime
+
+from fastapi import APIRouter
+from pydantic import BaseModel
+
+from ..config import settings
+from ..db.session import read_session
+from ..schemas import ChoreRead, CategoryRead, EventRead, TodoListWithItems, WeatherResponse
+from ..serialize import RowsResponse
+from .categories import query_categories
+from .chores import query_chores
+from .events import query_events
+from .lists import query_todo_lists
+from .weather import get_weather
+
+log = logging.getLogger(__name__)
+
+router = APIRouter(prefix="/api/dashboard", tags=["dashboard"])
+
+
+class Dashboard(BaseModel):
+    events: list[EventRead]
+    chores: list[ChoreRead]
+    lists: list[TodoListWithItems]
+    categories: list[CategoryRead]
+    # None when the weather service could not be reached
+    weather: WeatherResponse | None
+
+
+async def _weather(city: str, lat: float | None, lon: float | None) -> WeatherResponse | None:
+    try:
+        return await get_weather(lat=lat, lon=lon, city=city)
+    except Exception:
+        log.warning("Weather for dashboard failed", exc_info=True)
+        return None
+
+
+@router.get("", response_model=Dashboard, response_class=RowsResponse)
+async def get_dashboard(
+    start: datetime,
+    end: datetime,
+    completed: bool | None = False,
+    city: str = "London",
+    lat: float | None = None,
+    lon: float | None = None,
+):
+    """Events in [start, end] (series expanded), chores (open ones by default),
+    every list with its items, categories and the current weather."""
+    reads = [
+        lambda db: query_events(db, start, end),
+        lambda db: query_chores(db, completed=completed),
+        lambda db: query_todo_lists(db, include="items"),
+        query_categories,
+    ]
+    weather = asyncio.create_task(_weather(city, lat, lon))
+    try:
+        if settings.db_wal:
+            async def run(read):
+                async with read_session() as db:
+                    return await read(db)
+
+            results = await asyncio.gather(*(run(read) for read in reads))
+        else:
+            async with read_session() as db:
+                results = [await read(db) for read in reads]
+    except BaseException:
+        weather.cancel()
+        raise
+    events, chores, lists, categories = results
+    return RowsResponse({
+        "events": events, "chores": chores, "lists": lists, "categories": categories, "weather": await weather,
+    })
@@ -1,43 +1,152 @@
 from __future__ import annotations
 
+import calendar
 from datetime import datetime, date
-from fastapi import APIRouter, Depends, HTTPException
+from operator import itemgetter
+from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select, and_
+from sqlalchemy import null, select, or_
 
-from ..db import get_db
+from ..changes import record
+from ..config import settings
+from ..db import get_read_db, write_queue
+from ..db.crud import insert_row, update_row, delete_row
 from ..models import Event
+from ..models.event import events_rtree
+from ..recurrence import naive_utc, occurrence_index
 from ..schemas import EventCreate, EventUpdate, EventRead
+from ..serialize import RowsResponse, as_dicts, read_columns
+from ..sync.jobs import ensure_window
+from .conditional import Delta, delta, etag, watermark
+from .pagination import MAX_PAGE, decode_cursor, split_page
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
+# EventRead's columns; recurrence_id is only set on expanded occurrences
+_COLUMNS = (*read_columns(Event, EventRead), null().label("recurrence_id"))
 
-@router.get("", response_model=list[EventRead])
+
+@router.get("", response_model=list[EventRead] | Delta[EventRead], response_class=RowsResponse)
 async def list_events(
     start: datetime | None = None,
     end: datetime | None = None,
-    db: AsyncSession = Depends(get_db),
+    expand: bool = True,
+    updated_since: datetime | None = None,
+    limit: int = Query(settings.page_size, ge=1, le=MAX_PAGE),
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    headers: dict = Depends(etag("events")),
 ):
-    q = select(Event).order_by(Event.start)
+    """Events overlapping [start, end]; see ``query_events``.
+
+    Unless series are expanded over both bounds or ``updated_since`` asks
+    for a delta, results come in pages of ``limit`` ordered by (start, id),
+    with the cursor of the next page in the X-Next-Cursor header.
+    """
+    if updated_since is not None or (expand and start and end):
+        return RowsResponse(await query_events(db, start, end, expand, updated_since), headers=headers)
+    after = decode_cursor(cursor, datetime, int) if cursor else None
+    events = await query_events(db, start, end, expand, after=after, limit=limit + 1)
+    events, more = split_page(events, limit, itemgetter("start", "id"))
+    return RowsResponse(events, headers={**headers, **more})
+
+
+async def query_events(
+    db: AsyncSession,
+    start: datetime | None = None,
+    end: datetime | None = None,
+    expand: bool = True,
+    updated_since: datetime | None = None,
+    after: tuple[datetime, int] | None = None,
+    limit: int | None = None,
+) -> list[dict] | dict:
+    """Events overlapping [start, end], as EventRead-shaped dicts.
+
+    With both bounds and ``expand`` (the default), recurring series are
+    expanded into one entry per occurrence, each carrying the series id and
+    its ``recurrence_id``. With ``updated_since`` only events changed after
+    it are returned, as a delta; a changed series comes with all its
+    occurrences in the range. Otherwise ``after`` and ``limit`` select a
+    page of stored events in (start, id) order.
+    """
+    if settings.sync_lazy_window and start and end:
+        await ensure_window(start, end)
+    start = naive_utc(start) if start else None
+    end = naive_utc(end) if end else None
+    changed = []
+    if updated_since is not None:
+        since, mark = watermark(updated_since)
+        changed = [Event.updated_at > since]
+    if expand and start and end:
+        events = await _expanded_events(db, start, end, *changed)
+    else:
+        q = _in_range(select(*_COLUMNS).where(*changed).order_by(Event.start, Event.id), start, end)
+        if start:
+            q = q.where(Event.end >= start)
+        if end:
+            q = q.where(Event.start <= end)
+        if after is not None:
+            # The first term keeps the scan a range on the start index
+            q = q.where(Event.start >= after[0], or_(Event.start > after[0], Event.id > after[1]))
+        if limit is not None:
+            q = q.limit(limit)
+        r = await db.execute(q)
+        events = as_dicts(r.all())
+    if updated_since is None:
+        return events
+    return await delta(db, Event, since, mark, events)
+
+
+def _in_range(q, start: datetime | None, end: datetime | None):
+    """Narrow ``q`` through the R*Tree when enabled; callers still filter exactly."""
+    if not settings.event_interval_index or not (start or end):
+        return q
+    hits = select(events_rtree.c.id)
     if start:
-        q = q.where(Event.end >= start)
+        hits = hits.where(events_rtree.c.hi >= calendar.timegm(start.timetuple()))
     if end:
-        q = q.where(Event.start <= end)
-    r = await db.execute(q)
-    return [EventRead.model_validate(e) for e in r.scalars().all()]
+        hits = hits.where(events_rtree.c.lo <= calendar.timegm(end.timetuple()))
+    return q.where(Event.id.in_(hits))
+
+
+async def _expanded_events(db: AsyncSession, start: datetime, end: datetime, *where) -> list[dict]:
+    r = await db.execute(
+        _in_range(select(*_COLUMNS), start, end)
+        .where(
+            *where,
+            Event.start <= end,
+            # A series can recur long after its first occurrence
+            or_(Event.end >= start, Event.recurrence.is_not(None)),
+        )
+        .order_by(Event.start)
+    )
+    out = []
+    for e in r.all():
+        base = e._asdict()
+        starts = occurrence_index.occurrences(e, start, end) if e.recurrence else None
+        if starts is None:
+            # Not recurring, or a rule we cannot parse: the row as stored
+            if e.end >= start:
+                out.append(base)
+            continue
+        duration = e.end - e.start
+        out.extend({**base, "start": s, "end": s + duration, "recurrence_id": s} for s in starts)
+    out.sort(key=itemgetter("start"))
+    return out
 
 
 @router.post("", response_model=EventRead, status_code=201)
-async def create_event(schema: EventCreate, db: AsyncSession = Depends(get_db)):
-    event = Event(**schema.model_dump())
-    db.add(event)
-    await db.flush()
-    await db.refresh(event)
-    return EventRead.model_validate(event)
+async def create_event(schema: EventCreate):
+    async def write(db: AsyncSession):
+        event = EventRead.model_validate(await insert_row(db, Event, schema.model_dump()))
+        record(db, "events", "upsert", rows=[event])
+        return event
+
+    return await write_queue.run(write)
 
 
 @router.get("/{event_id}", response_model=EventRead)
-async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
+async def get_event(event_id: int, db: AsyncSession = Depends(get_read_db)):
     r = await db.execute(select(Event).where(Event.id == event_id))
     event = r.scalar_one_or_none()
     if not event:
@@ -46,26 +155,26 @@ async def get_event(event_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.patch("/{event_id}", response_model=EventRead)
-async def update_event(
-    event_id: int, schema: EventUpdate, db: AsyncSession = Depends(get_db)
-):
-    r = await db.execute(select(Event).where(Event.id == event_id))
-    event = r.scalar_one_or_none()
-    if not event:
-        raise HTTPException(404, "Event not found")
-    data = schema.model_dump(exclude_unset=True)
-    for k, v in data.items():
-        setattr(event, k, v)
-    await db.flush()
-    await db.refresh(event)
-    return EventRead.model_validate(event)
+async def update_event(event_id: int, schema: EventUpdate):
+    async def write(db: AsyncSession):
+        event = await update_row(db, Event, event_id, schema.model_dump(exclude_unset=True))
+        if not event:
+            raise HTTPException(404, "Event not found")
+        occurrence_index.invalidate(event_id)
+        event = EventRead.model_validate(event)
+        record(db, "events", "upsert", rows=[event])
+        return event
+
+    return await write_queue.run(write)
 
 
 @router.delete("/{event_id}", status_code=204)
-async def delete_event(event_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(Event).where(Event.id == event_id))
-    event = r.scalar_one_or_none()
-    if not event:
-        raise HTTPException(404, "Event not found")
-    await db.delete(event)
-    return None
+async def delete_event(event_id: int):
+    async def write(db: AsyncSession):
+        if not await delete_row(db, Event, event_id):
+            raise HTTPException(404, "Event not found")
+        occurrence_index.invalidate(event_id)
+        record(db, "events", "delete", ids=[event_id])
+        return None
+
+    return await write_queue.run(write)
@@ -1,38 +1,108 @@
+from datetime import datetime
+from typing import Literal
+
 from fastapi import APIRouter, Depends, HTTPException
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from sqlalchemy.orm import selectinload
+from sqlalchemy import select, func, case
 
-from ..db import get_db
+from ..changes import record
+from ..db import get_read_db, write_queue
+from ..db.crud import insert_row, insert_rows, update_row, update_rows, delete_row, add_tombstones
 from ..models import TodoList, TodoItem
+from ..ordering import RANK_GAP, append_rank, move_item
 from ..schemas import (
     TodoListCreate,
     TodoListRead,
+    TodoListWithItems,
+    TodoListWithCounts,
     TodoItemCreate,
     TodoItemUpdate,
+    TodoItemBulkUpdate,
+    TodoItemMove,
     TodoItemRead,
 )
+from ..serialize import RowsResponse, as_dicts, read_columns
+
+from .conditional import Delta, delta, etag, watermark
 
 router = APIRouter(prefix="/api/lists", tags=["lists"])
 
 
-@router.get("", response_model=list[TodoListRead])
-async def list_todo_lists(db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(TodoList).order_by(TodoList.created_at))
-    return [TodoListRead.model_validate(t) for t in r.scalars().all()]
+@router.get(
+    "",
+    response_model=list[TodoListWithItems | TodoListWithCounts | TodoListRead] | Delta[TodoListRead],
+    response_class=RowsResponse,
+)
+async def list_todo_lists(
+    include: Literal["items", "counts"] | None = None,
+    updated_since: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    # Embedded items and counts change with the items table
+    headers: dict = Depends(etag("todo_lists", "todo_items")),
+):
+    return RowsResponse(await query_todo_lists(db, include, updated_since), headers=headers)
+
+
+async def query_todo_lists(
+    db: AsyncSession,
+    include: Literal["items", "counts"] | None = None,
+    updated_since: datetime | None = None,
+) -> list[dict] | dict:
+    """All lists; ``include=items`` embeds each list's items (one extra
+    query for all of them), ``include=counts`` adds open/done item counts.
+    ``updated_since`` returns the lists changed since as a delta; item
+    changes are fetched per list."""
+    q = select(*read_columns(TodoList, TodoListRead)).order_by(TodoList.created_at)
+    if updated_since is not None:
+        if include:
+            raise HTTPException(400, "updated_since cannot be combined with include")
+        since, mark = watermark(updated_since)
+        r = await db.execute(q.where(TodoList.updated_at > since))
+        return await delta(db, TodoList, since, mark, as_dicts(r.all()))
+    if include == "items":
+        r = await db.execute(q)
+        lists = as_dicts(r.all())
+        by_id = {lst["id"]: lst for lst in lists}
+        for lst in lists:
+            lst["items"] = []
+        r = await db.execute(
+            select(*read_columns(TodoItem, TodoItemRead)).order_by(TodoItem.sort_order, TodoItem.id)
+        )
+        for item in as_dicts(r.all()):
+            lst = by_id.get(item["list_id"])
+            if lst is not None:
+                lst["items"].append(item)
+        return lists
+    if include == "counts":
+        done = func.sum(case((TodoItem.completed.is_(True), 1), else_=0))
+        counts = (
+            select(TodoItem.list_id, (func.count() - done).label("open"), done.label("done"))
+            .group_by(TodoItem.list_id)
+            .subquery()
+        )
+        r = await db.execute(
+            q.add_columns(
+                func.coalesce(counts.c.open, 0).label("open_count"),
+                func.coalesce(counts.c.done, 0).label("done_count"),
+            ).outerjoin(counts, counts.c.list_id == TodoList.id)
+        )
+        return as_dicts(r.all())
+    r = await db.execute(q)
+    return as_dicts(r.all())
 
 
 @router.post("", response_model=TodoListRead, status_code=201)
-async def create_todo_list(schema: TodoListCreate, db: AsyncSession = Depends(get_db)):
-    lst = TodoList(**schema.model_dump())
-    db.add(lst)
-    await db.flush()
-    await db.refresh(lst)
-    return TodoListRead.model_validate(lst)
+async def create_todo_list(schema: TodoListCreate):
+    async def write(db: AsyncSession):
+        lst = TodoListRead.model_validate(await insert_row(db, TodoList, schema.model_dump()))
+        record(db, "todo_lists", "upsert", rows=[lst])
+        return lst
+
+    return await write_queue.run(write)
 
 
 @router.get("/{list_id}", response_model=TodoListRead)
-async def get_todo_list(list_id: int, db: AsyncSession = Depends(get_db)):
+async def get_todo_list(list_id: int, db: AsyncSession = Depends(get_read_db)):
     r = await db.execute(select(TodoList).where(TodoList.id == list_id))
     lst = r.scalar_one_or_none()
     if not lst:
@@ -41,38 +111,122 @@ async def get_todo_list(list_id: int, db: AsyncSession = Depends(get_db)):
 
 
 @router.delete("/{list_id}", status_code=204)
-async def delete_todo_list(list_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(select(TodoList).where(TodoList.id == list_id))
-    lst = r.scalar_one_or_none()
-    if not lst:
-        raise HTTPException(404, "List not found")
-    await db.execute(TodoItem.__table__.delete().where(TodoItem.list_id == list_id))
-    await db.delete(lst)
-    return None
+async def delete_todo_list(list_id: int):
+    async def write(db: AsyncSession):
+        if not await delete_row(db, TodoList, list_id):
+            raise HTTPException(404, "List not found")
+        r = await db.execute(
+            TodoItem.__table__.delete().where(TodoItem.list_id == list_id).returning(TodoItem.id)
+        )
+        item_ids = r.scalars().all()
+        await add_tombstones(db, "todo_items", item_ids)
+        record(db, "todo_lists", "delete", ids=[list_id])
+        if item_ids:
+            record(db, "todo_items", "delete", ids=item_ids)
+        return None
 
+    return await write_queue.run(write)
 
-@router.get("/{list_id}/items", response_model=list[TodoItemRead])
-async def list_items(list_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(
-        select(TodoItem)
+
+@router.get(
+    "/{list_id}/items", response_model=list[TodoItemRead] | Delta[TodoItemRead], response_class=RowsResponse
+)
+async def list_items(
+    list_id: int,
+    updated_since: datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    headers: dict = Depends(etag("todo_items")),
+):
+    q = (
+        select(*read_columns(TodoItem, TodoItemRead))
         .where(TodoItem.list_id == list_id)
         .order_by(TodoItem.sort_order, TodoItem.id)
     )
-    return [TodoItemRead.model_validate(i) for i in r.scalars().all()]
+    if updated_since is not None:
+        since, mark = watermark(updated_since)
+        r = await db.execute(q.where(TodoItem.updated_at > since))
+        items = await delta(db, TodoItem, since, mark, as_dicts(r.all()), TodoItem.list_id == list_id)
+    else:
+        r = await db.execute(q)
+        items = as_dicts(r.all())
+    return RowsResponse(items, headers=headers)
 
 
 @router.post("/{list_id}/items", response_model=TodoItemRead, status_code=201)
-async def create_item(
-    list_id: int, schema: TodoItemCreate, db: AsyncSession = Depends(get_db)
-):
-    r = await db.execute(select(TodoList).where(TodoList.id == list_id))
-    if not r.scalar_one_or_none():
+async def create_item(list_id: int, schema: TodoItemCreate):
+    async def write(db: AsyncSession):
+        await _require_list(db, list_id)
+        data = schema.model_dump()
+        if data["sort_order"] is None:
+            data["sort_order"] = await append_rank(db, list_id)
+        item = TodoItemRead.model_validate(await insert_row(db, TodoItem, {"list_id": list_id, **data}))
+        record(db, "todo_items", "upsert", rows=[item])
+        return item
+
+    return await write_queue.run(write)
+
+
+async def _require_list(db: AsyncSession, list_id: int) -> None:
+    r = await db.execute(select(TodoList.id).where(TodoList.id == list_id))
+    if r.scalar_one_or_none() is None:
         raise HTTPException(404, "List not found")
-    item = TodoItem(list_id=list_id, **schema.model_dump())
-    db.add(item)
-    await db.flush()
-    await db.refresh(item)
-    return TodoItemRead.model_validate(item)
+
+
+@router.post("/{list_id}/items/bulk", response_model=list[TodoItemRead], status_code=201)
+async def create_items(list_id: int, schema: list[TodoItemCreate]):
+    """Create several items in one transaction, returned in request order."""
+    async def write(db: AsyncSession):
+        await _require_list(db, list_id)
+        rank = await append_rank(db, list_id)
+        values = []
+        for s in schema:
+            data = s.model_dump()
+            if data["sort_order"] is None:
+                data["sort_order"] = rank
+                rank += RANK_GAP
+            values.append({"list_id": list_id, **data})
+        items = [TodoItemRead.model_validate(row) for row in await insert_rows(db, TodoItem, values)]
+        record(db, "todo_items", "upsert", rows=items)
+        return items
+
+    return await write_queue.run(write)
+
+
+@router.patch("/{list_id}/items", response_model=list[TodoItemRead])
+async def update_items(list_id: int, schema: list[TodoItemBulkUpdate]):
+    """Patch several items in one statement, e.g. new sort_order values after
+    a drag-to-reorder. All or nothing: 404 if any item is not in the list.
+    """
+    changes: dict[int, dict] = {}
+    for s in schema:
+        changes.setdefault(s.id, {}).update(s.model_dump(exclude_unset=True, exclude={"id"}))
+
+    async def write(db: AsyncSession):
+        rows = {row.id: row for row in await update_rows(db, TodoItem, changes, TodoItem.list_id == list_id)}
+        if len(rows) != len(changes):
+            raise HTTPException(404, "Item not found")
+        items = [TodoItemRead.model_validate(rows[i]) for i in changes]
+        record(db, "todo_items", "upsert", rows=items)
+        return items
+
+    return await write_queue.run(write)
+
+
+@router.post("/{list_id}/items/{item_id}/move", response_model=TodoItemRead)
+async def move_todo_item(list_id: int, item_id: int, schema: TodoItemMove):
+    """Move an item after another one (or to the top), writing only that item."""
+    if schema.after_id == item_id:
+        raise HTTPException(400, "Cannot move an item after itself")
+
+    async def write(db: AsyncSession):
+        item = await move_item(db, list_id, item_id, schema.after_id)
+        if not item:
+            raise HTTPException(404, "Item not found")
+        item = TodoItemRead.model_validate(item)
+        record(db, "todo_items", "upsert", rows=[item])
+        return item
+
+    return await write_queue.run(write)
 
 
 @router.patch("/{list_id}/items/{item_id}", response_model=TodoItemRead)
@@ -80,34 +234,26 @@ async def update_item(
     list_id: int,
     item_id: int,
     schema: TodoItemUpdate,
-    db: AsyncSession = Depends(get_db),
 ):
-    r = await db.execute(
-        select(TodoItem).where(
-            TodoItem.id == item_id,
-            TodoItem.list_id == list_id,
+    async def write(db: AsyncSession):
+        item = await update_row(
+            db, TodoItem, item_id, schema.model_dump(exclude_unset=True), TodoItem.list_id == list_id
         )
-    )
-    item = r.scalar_one_or_none()
-    if not item:
-        raise HTTPException(404, "Item not found")
-    for k, v in schema.model_dump(exclude_unset=True).items():
-        setattr(item, k, v)
-    await db.flush()
-    await db.refresh(item)
-    return TodoItemRead.model_validate(item)
+        if not item:
+            raise HTTPException(404, "Item not found")
+        item = TodoItemRead.model_validate(item)
+        record(db, "todo_items", "upsert", rows=[item])
+        return item
+
+    return await write_queue.run(write)
 
 
 @router.delete("/{list_id}/items/{item_id}", status_code=204)
-async def delete_item(list_id: int, item_id: int, db: AsyncSession = Depends(get_db)):
-    r = await db.execute(
-        select(TodoItem).where(
-            TodoItem.id == item_id,
-            TodoItem.list_id == list_id,
-        )
-    )
-    item = r.scalar_one_or_none()
-    if not item:
-        raise HTTPException(404, "Item not found")
-    await db.delete(item)
-    return None
+async def delete_item(list_id: int, item_id: int):
+    async def write(db: AsyncSession):
+        if not await delete_row(db, TodoItem, item_id, TodoItem.list_id == list_id):
+            raise HTTPException(404, "Item not found")
+        record(db, "todo_items", "delete", ids=[item_id])
+        return None
+
+    return await write_queue.run(write)
@@ -0,0 +1,49 @@
+"""Keyset pagination for list endpoints that could return a whole table.
+
+A page is the rows after a cursor in the listing's order, fetched with
+``WHERE key > cursor ... LIMIT``, so each page is one index range however
+deep it is, and rows added or removed meanwhile never shift later pages.
+The cursor is the last row's sort key, opaque to clients (base64url
+JSON). It is sent in the ``X-Next-Cursor`` header, absent on the last
+page, so the body stays a plain list.
+"""
+import base64
+from collections.abc import Callable
+from datetime import date, datetime
+
+import orjson
+from fastapi import HTTPException
+
+MAX_PAGE = 1000
+NEXT_CURSOR = "X-Next-Cursor"
+
+
+def encode_cursor(*key) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(key)).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, *types: type) -> tuple:
+    """The key in ``cursor``, parsed as ``types`` (None stays None); 400 if malformed."""
+    try:
+        key = orjson.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(key, list) or len(key) != len(types):
+            raise ValueError
+        return tuple(None if value is None else _parse(t, value) for t, value in zip(types, key))
+    except (ValueError, TypeError):
+        raise HTTPException(400, "Invalid cursor")
+
+
+def _parse(t: type, value):
+    if t in (datetime, date):
+        return t.fromisoformat(value)
+    if not isinstance(value, t):
+        raise TypeError
+    return value
+
+
+def split_page(rows: list[dict], limit: int, key: Callable[[dict], tuple]) -> tuple[list[dict], dict]:
+    """A page of ``rows`` (fetched with ``limit + 1``) and its cursor header, if more follow."""
+    if len(rows) <= limit:
+        return rows, {}
+    rows = rows[:limit]
+    return rows, {NEXT_CURSOR: encode_cursor(*key(rows[-1]))}
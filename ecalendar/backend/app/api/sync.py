@@ -1,13 +1,18 @@
 """Calendar sync API - CalDAV."""
-import asyncio
+from datetime import datetime
+
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select
 
+from ..crypto import encrypt, decrypt
 from ..db import get_db
-from ..models import Event
-from ..sync.caldav_sync import sync_caldav
+from ..models import CalendarSync
+from ..sync.importer import sync_horizon
+from ..sync.jobs import SyncJob, sync_jobs
+from ..sync.scheduler import scheduler
 
 router = APIRouter(prefix="/api/sync", tags=["sync"])
 
@@ -19,35 +24,169 @@ class CalDAVConfig(BaseModel):
 
 
 class SyncResult(BaseModel):
+    sync_id: int | None = None
+    name: str | None = None
     imported: int
+    updated: int = 0
+    deleted: int = 0
+    calendars_fetched: int = 0
+    calendars_skipped: int = 0
+    items_fetched: int = 0
+    items_skipped: int = 0
     errors: list[str]
 
 
-@router.post("/caldav", response_model=SyncResult)
-async def run_caldav_sync(config: CalDAVConfig, db: AsyncSession = Depends(get_db)):
-    """Sync events from a CalDAV server (iCloud, Nextcloud, etc.)."""
-    try:
-        events_data = await sync_caldav(config.url, config.username, config.password)
-    except Exception as e:
-        raise HTTPException(400, f"CalDAV sync failed: {str(e)}")
-
-    imported = 0
-    errors = []
-    for ed in events_data:
-        try:
-            r = await db.execute(
-                select(Event).where(
-                    Event.external_id == ed.get("external_id"),
-                    Event.source == "caldav",
-                )
-            )
-            if r.scalar_one_or_none():
-                continue
-            ev = Event(**ed)
-            db.add(ev)
-            imported += 1
-        except Exception as e:
-            errors.append(str(e))
+class SyncProgress(BaseModel):
+    calendars_total: int
+    calendars_done: int
+    events_parsed: int
+    rows_upserted: int
+
+
+class SyncJobRead(BaseModel):
+    id: str
+    sync_id: int
+    name: str
+    status: str
+    started: datetime
+    finished: datetime | None
+    progress: SyncProgress
+    errors: list[str]
+    result: SyncResult | None
+
+
+class SyncScheduleStatus(BaseModel):
+    sync_id: int
+    name: str
+    status: str
+    last_run: datetime | None
+    last_duration: float | None
+    next_run: datetime | None
+    failures: int
+    last_error: str | None
+    last_result: SyncResult | None
+
+
+async def _get_or_create_sync(db: AsyncSession, config: CalDAVConfig) -> CalendarSync:
+    r = await db.execute(
+        select(CalendarSync).where(
+            CalendarSync.source == "caldav",
+            CalendarSync.url == config.url,
+            CalendarSync.username == config.username,
+        )
+    )
+    cs = r.scalar_one_or_none()
+    if not cs:
+        cs = CalendarSync(name=config.username, source="caldav", url=config.url, username=config.username)
+        db.add(cs)
+    # Kept so the events API can widen the sync window lazily
+    cs.token_encrypted = encrypt(config.password)
     await db.flush()
+    return cs
+
+
+@router.post("/caldav", response_model=SyncJobRead, status_code=202)
+async def run_caldav_sync(config: CalDAVConfig, db: AsyncSession = Depends(get_db)):
+    """Start a sync from a CalDAV server (iCloud, Nextcloud, etc.).
+
+    Returns the job immediately; follow it via /api/sync/jobs/{id}/events.
+    """
+    cs = await _get_or_create_sync(db, config)
+    # The job uses its own session and must see the account row
+    await db.commit()
+    return _job_read(sync_jobs.submit(cs, config.password, sync_horizon()))
+
+
+@router.post("/all", response_model=list[SyncJobRead], status_code=202)
+async def run_all_syncs(db: AsyncSession = Depends(get_db)):
+    """Start syncs for every enabled CalDAV account with stored credentials."""
+    r = await db.execute(
+        select(CalendarSync).where(
+            CalendarSync.source == "caldav",
+            CalendarSync.enabled.is_(True),
+            CalendarSync.token_encrypted.is_not(None),
+        )
+    )
+    jobs = []
+    for cs in r.scalars().all():
+        password = decrypt(cs.token_encrypted)
+        if password is not None:
+            jobs.append(sync_jobs.submit(cs, password, sync_horizon()))
+    return [_job_read(job) for job in jobs]
+
+
+def _sync_result(sync_id: int, name: str, result: dict) -> SyncResult:
+    stats = result["stats"]
+    return SyncResult(
+        sync_id=sync_id,
+        name=name,
+        imported=result["imported"],
+        updated=result["updated"],
+        deleted=result["deleted"],
+        calendars_fetched=stats["calendars_fetched"],
+        calendars_skipped=stats["calendars_skipped"],
+        items_fetched=stats["items_fetched"],
+        items_skipped=stats["items_skipped"],
+        errors=result["errors"],
+    )
+
+
+def _job_read(job: SyncJob, snap: dict | None = None) -> SyncJobRead:
+    snap = snap or job.snapshot()
+    if snap["result"] is not None:
+        snap["result"] = _sync_result(job.sync_id, job.name, snap["result"])
+    return SyncJobRead(**snap)
+
+
+@router.get("/jobs", response_model=list[SyncJobRead])
+async def list_sync_jobs():
+    """Running and recently finished sync jobs, oldest first."""
+    return [_job_read(job) for job in sync_jobs.jobs.values()]
+
+
+@router.get("/jobs/{job_id}", response_model=SyncJobRead)
+async def get_sync_job(job_id: str):
+    job = sync_jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Sync job not found")
+    return _job_read(job)
+
+
+@router.get("/jobs/{job_id}/events")
+async def stream_sync_job(job_id: str):
+    """Server-sent events with a job snapshot on every progress change."""
+    job = sync_jobs.get(job_id)
+    if not job:
+        raise HTTPException(404, "Sync job not found")
+
+    async def events():
+        async for snap in job.stream():
+            yield f"data: {_job_read(job, snap).model_dump_json()}\n\n"
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _schedule_status(entry: dict) -> SyncScheduleStatus:
+    data = {k: v for k, v in entry.items() if k != "last_result"}
+    last_result = None
+    if entry["last_result"] is not None:
+        last_result = _sync_result(entry["sync_id"], entry["name"], entry["last_result"])
+    return SyncScheduleStatus(**data, last_result=last_result)
+
+
+@router.get("/schedule", response_model=list[SyncScheduleStatus])
+async def list_sync_schedule():
+    """Background sync status for each enabled account."""
+    return [_schedule_status(entry) for entry in scheduler.jobs.values()]
+
 
-    return SyncResult(imported=imported, errors=errors[:5])
+@router.get("/schedule/{sync_id}", response_model=SyncScheduleStatus)
+async def get_sync_schedule(sync_id: int):
+    entry = scheduler.jobs.get(sync_id)
+    if not entry:
+        raise HTTPException(404, "Sync schedule not found")
+    return _schedule_status(entry)
@@ -1,35 +1,110 @@
 from __future__ import annotations
 
+import unicodedata
+from datetime import datetime, timedelta
+
 import httpx
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy import select
+from sqlalchemy.dialects.sqlite import insert
 
-from ..schemas import WeatherResponse
+from ..cache import TTLCache
+from ..config import settings
+from ..db import write_queue
+from ..db.session import read_session
+from ..http_client import http_client
+from ..models import Geocode
+from ..schemas import WeatherResponse, HourlyForecast, DailyForecast, LocationForecast
 
 router = APIRouter(prefix="/api/weather", tags=["weather"])
 
 OPEN_METEO = "https://api.open-meteo.com/v1/forecast"
+GEOCODING = "https://geocoding-api.open-meteo.com/v1/search"
+CURRENT = "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,apparent_temperature"
+HOURLY = "temperature_2m,weather_code,precipitation_probability,wind_speed_10m"
+DAILY = "weather_code,temperature_2m_max,temperature_2m_min,precipitation_sum,precipitation_probability_max"
+# Locations per forecast request
+MAX_LOCATIONS = 50
+# Found cities are kept for good; a name that matched nothing is retried after this
+GEOCODE_MISS_TTL = timedelta(days=1)
+
+weather_cache = TTLCache(
+    ttl=settings.weather_cache_ttl,
+    max_stale=settings.weather_cache_max_stale,
+    max_entries=settings.weather_cache_size,
+)
+# Keyed by rounded coordinates and days, without the display name
+forecast_cache = TTLCache(
+    ttl=settings.weather_cache_ttl,
+    max_stale=settings.weather_cache_max_stale,
+    max_entries=settings.weather_cache_size,
+)
 
 
 @router.get("", response_model=WeatherResponse)
 async def get_weather(lat: float | None = None, lon: float | None = None, city: str = "London"):
+    # Coordinates finer than ~100 m do not change the forecast
+    if lat is not None:
+        lat = round(lat, 3)
+    if lon is not None:
+        lon = round(lon, 3)
+    return await weather_cache.get((lat, lon, city), lambda: _fetch_weather(lat, lon, city))
+
+
+@router.get("/forecast", response_model=list[LocationForecast])
+async def get_forecast(
+    lat: list[float] = Query(...),
+    lon: list[float] = Query(...),
+    name: list[str] = Query([]),
+    days: int = Query(7, ge=1, le=16),
+):
+    """Current, hourly and daily forecasts for several locations.
+
+    ``lat``/``lon`` (and optionally ``name``, returned as the city) are
+    repeated once per location. Locations that are not cached are fetched
+    from Open-Meteo together, in one request.
+    """
+    if len(lat) != len(lon) or (name and len(name) != len(lat)):
+        raise HTTPException(400, "lat, lon and name must be given once per location")
+    if len(lat) > MAX_LOCATIONS:
+        raise HTTPException(400, f"At most {MAX_LOCATIONS} locations per request")
+    keys = [(round(a, 3), round(o, 3), days) for a, o in zip(lat, lon)]
+    forecasts = await forecast_cache.get_many(keys, _fetch_forecasts)
+    names = name or [f"{a}, {o}" for a, o, _ in keys]
+    return [
+        f.model_copy(update={"current": f.current.model_copy(update={"city": n})})
+        for f, n in zip(forecasts, names)
+    ]
+
+
+@router.get("/cache")
+async def weather_cache_stats():
+    return {"weather": weather_cache.stats(), "forecast": forecast_cache.stats()}
+
+
+async def _fetch_weather(lat: float | None, lon: float | None, city: str) -> WeatherResponse:
     params = {
         "latitude": lat or 51.5074,
         "longitude": lon or -0.1278,
-        "current": "temperature_2m,relative_humidity_2m,weather_code,wind_speed_10m,apparent_temperature",
+        "current": CURRENT,
     }
-    if lat is None and lon is None:
-        geo = await _geocode(city)
-        if geo:
-            params["latitude"] = geo["lat"]
-            params["longitude"] = geo["lon"]
-
-    async with httpx.AsyncClient() as client:
-        r = await client.get(OPEN_METEO, params=params, timeout=10.0)
+    try:
+        if lat is None and lon is None:
+            geo = await _geocode(city)
+            if geo:
+                params["latitude"] = geo["lat"]
+                params["longitude"] = geo["lon"]
+
+        r = await http_client().get(OPEN_METEO, params=params, timeout=10.0)
+    except httpx.HTTPError:
+        raise HTTPException(502, "Weather service unavailable")
     if r.status_code != 200:
         raise HTTPException(502, "Weather service unavailable")
 
-    data = r.json()
-    curr = data.get("current", {})
+    return _current(r.json().get("current", {}), city)
+
+
+def _current(curr: dict, city: str) -> WeatherResponse:
     code = curr.get("weather_code", 0)
     desc, icon = _wmo_code(code)
 
@@ -44,17 +119,99 @@ async def get_weather(lat: float | None = None, lon: float | None = None, city:
     )
 
 
+async def _fetch_forecasts(keys: list[tuple[float, float, int]]) -> dict:
+    # All keys of one fetch come from one request, so share its days
+    params = {
+        "latitude": ",".join(str(lat) for lat, _, _ in keys),
+        "longitude": ",".join(str(lon) for _, lon, _ in keys),
+        "current": CURRENT,
+        "hourly": HOURLY,
+        "daily": DAILY,
+        "forecast_days": keys[0][2],
+        "timezone": "auto",
+    }
+    try:
+        r = await http_client().get(OPEN_METEO, params=params, timeout=10.0)
+    except httpx.HTTPError:
+        raise HTTPException(502, "Weather service unavailable")
+    if r.status_code != 200:
+        raise HTTPException(502, "Weather service unavailable")
+    data = r.json()
+    # One location comes back as an object, several as a list in request order
+    if isinstance(data, dict):
+        data = [data]
+    return {key: _forecast(key, loc) for key, loc in zip(keys, data)}
+
+
+def _forecast(key: tuple[float, float, int], loc: dict) -> LocationForecast:
+    hourly = loc.get("hourly", {})
+    daily = loc.get("daily", {})
+
+    def at(block: dict, name: str, i: int):
+        values = block.get(name) or []
+        return values[i] if i < len(values) else None
+
+    hours = []
+    for i, t in enumerate(hourly.get("time", [])):
+        desc, icon = _wmo_code(at(hourly, "weather_code", i) or 0)
+        hours.append(HourlyForecast(
+            time=t,
+            temp=at(hourly, "temperature_2m", i) or 0,
+            description=desc,
+            icon=icon,
+            precipitation_probability=at(hourly, "precipitation_probability", i),
+            wind_speed=at(hourly, "wind_speed_10m", i) or 0,
+        ))
+    days = []
+    for i, d in enumerate(daily.get("time", [])):
+        desc, icon = _wmo_code(at(daily, "weather_code", i) or 0)
+        days.append(DailyForecast(
+            date=d,
+            temp_max=at(daily, "temperature_2m_max", i) or 0,
+            temp_min=at(daily, "temperature_2m_min", i) or 0,
+            description=desc,
+            icon=icon,
+            precipitation_sum=at(daily, "precipitation_sum", i),
+            precipitation_probability=at(daily, "precipitation_probability_max", i),
+        ))
+    return LocationForecast(
+        lat=key[0],
+        lon=key[1],
+        timezone=loc.get("timezone", "GMT"),
+        current=_current(loc.get("current", {}), ""),
+        hourly=hours,
+        daily=days,
+    )
+
+
+def geocode_key(city: str) -> str:
+    """Lookup key for a city name: case, Unicode form and spacing do not matter."""
+    return " ".join(unicodedata.normalize("NFKC", city).casefold().split())
+
+
 async def _geocode(city: str) -> dict | None:
-    url = "https://geocoding-api.open-meteo.com/v1/search"
-    async with httpx.AsyncClient() as client:
-        r = await client.get(url, params={"name": city, "count": 1}, timeout=5.0)
+    key = geocode_key(city)
+    async with read_session() as db:
+        r = await db.execute(select(Geocode).where(Geocode.key == key))
+        cached = r.scalar_one_or_none()
+    if cached is not None:
+        if cached.lat is not None:
+            return {"lat": cached.lat, "lon": cached.lon}
+        if datetime.utcnow() - cached.fetched_at < GEOCODE_MISS_TTL:
+            return None
+
+    r = await http_client().get(GEOCODING, params={"name": key, "count": 1}, timeout=5.0)
     if r.status_code != 200:
         return None
     data = r.json()
     results = data.get("results", [])
-    if not results:
-        return None
-    return {"lat": results[0]["latitude"], "lon": results[0]["longitude"]}
+    geo = {"lat": results[0]["latitude"], "lon": results[0]["longitude"]} if results else None
+
+    values = {"key": key, "lat": None, "lon": None, "fetched_at": datetime.utcnow(), **(geo or {})}
+    stmt = insert(Geocode).values(values)
+    stmt = stmt.on_conflict_do_update(index_elements=["key"], set_=values)
+    await write_queue.run(lambda db: db.execute(stmt))
+    return geo
 
 
 def _wmo_code(code: int) -> tuple[str, str]:
@@ -0,0 +1,146 @@
+"""In-process TTL cache for upstream API responses.
+
+Entries younger than ``ttl`` are served as they are. Older ones are still
+served, and a background refresh replaces them (stale-while-revalidate),
+until they pass ``max_stale``; then the caller waits for a fresh fetch, but
+if that fails the old value is served anyway, so an upstream outage only
+shows as stale data. Concurrent misses for one key share a single fetch,
+and ``get_many`` loads all the keys it is missing with one fetch.
+The least recently used entries are dropped beyond ``max_entries``.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable, Hashable
+from typing import Any
+
+log = logging.getLogger(__name__)
+
+Fetch = Callable[[], Awaitable[Any]]
+FetchMany = Callable[[list[Hashable]], Awaitable[dict]]
+
+
+class TTLCache:
+    def __init__(self, ttl: float, max_stale: float, max_entries: int):
+        self.ttl = ttl
+        self.max_stale = max_stale
+        self.max_entries = max_entries
+        # key -> (value, time.monotonic() when fetched)
+        self._entries: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._fetches: dict[Hashable, asyncio.Task] = {}
+        # Served from the cache / waited for a fetch
+        self.hits = 0
+        self.misses = 0
+        # Values served past ttl, and fetches that failed
+        self.stale = 0
+        self.errors = 0
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stale": self.stale,
+            "errors": self.errors,
+        }
+
+    def invalidate(self, key: Hashable | None = None) -> None:
+        if key is None:
+            self._entries.clear()
+        else:
+            self._entries.pop(key, None)
+
+    async def get(self, key: Hashable, fetch: Fetch) -> Any:
+        """Cached value for ``key``, calling ``fetch`` to (re)load it."""
+        async def fetch_one(keys):
+            return {key: await fetch()}
+
+        return (await self.get_many([key], fetch_one))[0]
+
+    async def get_many(self, keys: list[Hashable], fetch_many: FetchMany) -> list[Any]:
+        """Cached values for ``keys``, in order.
+
+        The keys that need loading are passed to ``fetch_many`` in one call,
+        which returns a dict of their values. Raises if one of them has no
+        value to fall back on.
+        """
+        found, wait, refresh, fallback = {}, [], [], {}
+        now = time.monotonic()
+        for key in dict.fromkeys(keys):
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                wait.append(key)
+                continue
+            value, fetched = entry
+            self._entries.move_to_end(key)
+            age = now - fetched
+            if age < self.ttl:
+                self.hits += 1
+                found[key] = value
+            elif age < self.max_stale:
+                self.hits += 1
+                self.stale += 1
+                found[key] = value
+                refresh.append(key)
+            else:
+                self.misses += 1
+                wait.append(key)
+                fallback[key] = value
+        if refresh:
+            self._fetch(refresh, fetch_many)
+        if wait:
+            tasks = self._fetch(wait, fetch_many)
+            unique = list(dict.fromkeys(tasks.values()))
+            results = dict(zip(unique, await asyncio.shield(asyncio.gather(*unique, return_exceptions=True))))
+            for key in wait:
+                result = results[tasks[key]]
+                if not isinstance(result, BaseException) and key in result:
+                    found[key] = result[key]
+                elif key in fallback:
+                    self.stale += 1
+                    found[key] = fallback[key]
+                elif isinstance(result, BaseException):
+                    raise result
+                else:
+                    raise LookupError(f"No value fetched for {key!r}")
+        return [found[key] for key in keys]
+
+    def _fetch(self, keys: list[Hashable], fetch_many: FetchMany) -> dict[Hashable, asyncio.Task]:
+        """Fetch tasks for ``keys``; keys not already being fetched share a new one."""
+        tasks = {key: self._fetches[key] for key in keys if key in self._fetches}
+        new = [key for key in keys if key not in tasks]
+        if new:
+            task = asyncio.create_task(self._load(new, fetch_many))
+            # Background refreshes have no awaiting caller to see errors
+            task.add_done_callback(lambda t: t.cancelled() or t.exception())
+            for key in new:
+                self._fetches[key] = tasks[key] = task
+        return tasks
+
+    async def _load(self, keys: list[Hashable], fetch_many: FetchMany) -> dict:
+        try:
+            values = await fetch_many(keys)
+        except Exception as e:
+            self.errors += 1
+            log.warning("Fetching %r failed: %r", keys if len(keys) > 1 else keys[0], e)
+            raise
+        finally:
+            for key in keys:
+                self._fetches.pop(key, None)
+        now = time.monotonic()
+        for key in keys:
+            if key in values:
+                self._entries[key] = (values[key], now)
+                self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return values
+
+    async def stop(self) -> None:
+        """Cancel refreshes still in flight (app shutdown)."""
+        tasks = list(set(self._fetches.values()))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -0,0 +1,137 @@
+"""Change feed for live clients.
+
+Writers record compact deltas on their session with ``record``; they are
+published when that session commits and dropped if it rolls back, so a
+subscriber never sees a change that did not happen and never sees one
+before it is readable. A delta is one of
+
+    {"seq", "table", "op": "upsert", "rows": [...]}   rows as the API returns them
+    {"seq", "table", "op": "delete", "ids": [...]}
+    {"seq", "table", "op": "refresh"}                 many rows changed (sync import)
+    {"seq", "op": "reset"}                            refetch everything
+    {"seq", "op": "hello"}                            first delta of a new subscription
+
+Sequence numbers belong to the process (``epoch``). A subscriber resumes
+from the last one it saw; if that is from an earlier process or older than
+the kept backlog, it gets a reset instead.
+"""
+import asyncio
+import uuid
+from collections import deque
+from collections.abc import AsyncIterator
+
+from pydantic import BaseModel
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+# Deltas kept for resuming subscribers, and queued per slow subscriber
+MAX_BACKLOG = 1000
+
+
+class ChangeFeed:
+    def __init__(self, max_backlog: int = MAX_BACKLOG):
+        self.epoch = uuid.uuid4().hex[:8]
+        self.seq = 0
+        self._backlog: deque[dict] = deque(maxlen=max_backlog)
+        self._subscribers: set[asyncio.Queue] = set()
+        # Table -> seq of its last change, the version behind list ETags
+        self.versions: dict[str, int] = {}
+
+    def version(self, *tables: str) -> int:
+        return max((self.versions.get(t, 0) for t in tables), default=0)
+
+    def publish(self, changes: list[dict]) -> None:
+        for change in changes:
+            self.seq += 1
+            change = {"seq": self.seq, **change}
+            self._backlog.append(change)
+            if "table" in change:
+                self.versions[change["table"]] = self.seq
+            for queue in self._subscribers:
+                try:
+                    queue.put_nowait(change)
+                except asyncio.QueueFull:
+                    # Too far behind to catch up delta by delta
+                    while not queue.empty():
+                        queue.get_nowait()
+                    queue.put_nowait(self._reset())
+
+    def _reset(self) -> dict:
+        return {"seq": self.seq, "op": "reset"}
+
+    def _missed(self, since: int) -> list[dict] | None:
+        """Deltas after ``since``, or None if they are no longer all kept."""
+        if since > self.seq:
+            return None
+        if since == self.seq:
+            return []
+        if not self._backlog or self._backlog[0]["seq"] > since + 1:
+            return None
+        return [c for c in self._backlog if c["seq"] > since]
+
+    async def stream(self, epoch: str | None = None, since: int | None = None,
+                     idle: float = 15.0) -> AsyncIterator[dict | None]:
+        """Deltas after ``since`` (of ``epoch``), then new ones as they come.
+
+        Without ``since`` a hello carrying the current seq comes first.
+        Yields None after ``idle`` seconds without a delta, so the caller
+        can keep the connection alive.
+        """
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self._backlog.maxlen)
+        self._subscribers.add(queue)
+        try:
+            last = self.seq
+            if since is None:
+                backlog = [{"seq": last, "op": "hello"}]
+            else:
+                missed = self._missed(since) if epoch == self.epoch else None
+                backlog = missed if missed is not None else [self._reset()]
+            for change in backlog:
+                yield change
+            while True:
+                try:
+                    change = await asyncio.wait_for(queue.get(), idle)
+                except asyncio.TimeoutError:
+                    yield None
+                    continue
+                # Already sent from the backlog
+                if change["seq"] > last or change["op"] == "reset":
+                    last = change["seq"]
+                    yield change
+        finally:
+            self._subscribers.discard(queue)
+
+
+change_feed = ChangeFeed()
+
+
+def record(db: AsyncSession, table: str, op: str, rows: list | None = None, ids: list[int] | None = None) -> None:
+    """Queue a delta on ``db``; it is published when ``db`` commits."""
+    change: dict = {"table": table, "op": op}
+    if rows is not None:
+        change["rows"] = [r.model_dump(mode="json") if isinstance(r, BaseModel) else r for r in rows]
+    if ids is not None:
+        change["ids"] = ids
+    db.sync_session.info.setdefault("changes", []).append(change)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish(session: Session) -> None:
+    changes = session.info.pop("changes", None)
+    if changes:
+        # One refresh per table is enough for a transaction
+        seen = set()
+        compact = []
+        for change in changes:
+            if change["op"] == "refresh":
+                if change["table"] in seen:
+                    continue
+                seen.add(change["table"])
+            compact.append(change)
+        change_feed.publish(compact)
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard(session: Session) -> None:
+    session.info.pop("changes", None)
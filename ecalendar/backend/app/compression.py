@@ -0,0 +1,99 @@
+"""Compression of API responses.
+
+Responses of at least ``minimum_size`` bytes with a compressible type are
+encoded with brotli when the client accepts it and ``brotli`` is
+installed, else with gzip. Only responses sent in one piece are
+considered: streamed ones (the change feed, files) pass through as they
+are, and the SPA's files come precompressed (see app.static).
+"""
+import gzip
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+COMPRESSIBLE = ("application/json", "application/javascript", "image/svg+xml", "text/")
+# Cheap enough per request; static files are compressed harder at build time
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+
+def accepted_encodings(header: str) -> set[str]:
+    """Codings an Accept-Encoding header allows (q=0 excluded)."""
+    accepted = set()
+    for part in header.split(","):
+        name, _, params = part.partition(";")
+        name = name.strip().lower()
+        weight = params.replace(" ", "")
+        if weight.startswith("q="):
+            try:
+                if float(weight[2:]) == 0:
+                    continue
+            except ValueError:
+                continue
+        if name:
+            accepted.add(name)
+    return accepted
+
+
+def _encoding(scope: Scope) -> str | None:
+    accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+    if brotli is not None and "br" in accepted:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY)
+    return gzip.compress(body, GZIP_LEVEL)
+
+
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        encoding = _encoding(scope) if scope["type"] == "http" else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        # The start message is held until the first body shows whether
+        # the response comes in one piece
+        start: Message | None = None
+
+        async def send_compressed(message: Message) -> None:
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            held, start = start, None
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=held["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not headers.get("content-type", "").startswith(COMPRESSIBLE)
+            ):
+                await send(held)
+                await send(message)
+                return
+            body = _compress(body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+            headers.add_vary_header("Accept-Encoding")
+            await send(held)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -6,6 +6,40 @@ class Settings(BaseSettings):
     data_dir: Path = Path("/data")
     secret_key: str = "change-me-in-production"
     debug: bool = False
+    # CalDAV sync horizon in days around today; 0 means unbounded on that side
+    sync_past_days: int = 90
+    sync_future_days: int = 365
+    # Queue a background fetch of older/newer ranges when /api/events asks
+    # outside what has been downloaded
+    sync_lazy_window: bool = False
+    # Calendars fetched concurrently across all accounts, and per CalDAV host
+    sync_workers: int = 6
+    sync_per_host: int = 3
+    # Background sync of enabled CalendarSync rows
+    sync_scheduler: bool = True
+    sync_interval_minutes: int = 30
+    # Answer event range queries through an R*Tree instead of the (start, end) index
+    event_interval_index: bool = False
+    # SQLite in WAL mode with one writer and a pool of read-only connections;
+    # off shares a single connection for everything
+    db_wal: bool = True
+    db_read_connections: int = 4
+    db_busy_timeout_ms: int = 5000
+    db_cache_mb: int = 16
+    db_mmap_mb: int = 64
+    # Weather responses are fresh for ttl seconds (Open-Meteo updates current
+    # conditions every 15 minutes), then served while a background refresh
+    # runs until max_stale, and after that only if the upstream fails
+    weather_cache_ttl: int = 900
+    weather_cache_max_stale: int = 3600
+    weather_cache_size: int = 256
+    # Deletions are remembered this long for updated_since queries; older
+    # watermarks get 410 and must refetch in full
+    tombstone_days: int = 30
+    # API responses at least this large are sent gzip/brotli compressed
+    compress_min_bytes: int = 1024
+    # Default page of the paginated list endpoints (at most 1000 per request)
+    page_size: int = 200
 
     class Config:
         env_prefix = ""
@@ -0,0 +1,82 @@
+"""Encryption for stored credentials.
+
+The key is derived from settings.secret_key when one is configured. The
+built-in default is public, so without one a random key is generated on
+first use and kept in ``secret.key`` in the data directory, readable only
+by its owner. Tokens written under an earlier key (the default-derived one
+of older versions, or the key file before SECRET_KEY was set) still
+decrypt, and ``rotate`` moves them to the current key.
+"""
+import base64
+import hashlib
+import os
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+
+from .config import Settings, settings
+
+DEFAULT_SECRET = Settings.model_fields["secret_key"].default
+KEY_FILE = "secret.key"
+
+
+def _derived(secret: str) -> bytes:
+    return base64.urlsafe_b64encode(hashlib.sha256(secret.encode()).digest())
+
+
+def _read_key_file() -> bytes | None:
+    path = settings.data_dir / KEY_FILE
+    try:
+        key = path.read_bytes().strip()
+    except FileNotFoundError:
+        return None
+    os.chmod(path, 0o600)
+    return key
+
+
+def _create_key_file() -> bytes:
+    try:
+        fd = os.open(settings.data_dir / KEY_FILE, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    except FileExistsError:
+        return _read_key_file()
+    key = Fernet.generate_key()
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    return key
+
+
+@lru_cache(maxsize=1)
+def _fernets() -> tuple[Fernet, ...]:
+    """The current key first, then the earlier ones tokens may be under."""
+    if settings.secret_key != DEFAULT_SECRET:
+        keys = [_derived(settings.secret_key), _read_key_file()]
+    else:
+        keys = [_create_key_file()]
+    keys.append(_derived(DEFAULT_SECRET))
+    return tuple(Fernet(key) for key in keys if key is not None)
+
+
+def encrypt(value: str) -> str:
+    return _fernets()[0].encrypt(value.encode()).decode()
+
+
+def decrypt(token: str) -> str | None:
+    try:
+        return MultiFernet(_fernets()).decrypt(token.encode()).decode()
+    except InvalidToken:
+        return None
+
+
+def rotate(token: str) -> str | None:
+    """``token`` re-encrypted under the current key, or None if it already
+    is (or no key opens it).
+    """
+    try:
+        _fernets()[0].decrypt(token.encode())
+        return None
+    except InvalidToken:
+        pass
+    try:
+        return MultiFernet(_fernets()).rotate(token.encode()).decode()
+    except InvalidToken:
+        return None
@@ -1,4 +1,5 @@
-from .session import get_db, init_db, engine, AsyncSession
+from .session import get_db, get_read_db, init_db, migrate_online, engine, AsyncSession
 from .base import Base
+from .writer import write_queue
 
-__all__ = ["get_db", "init_db", "engine", "AsyncSession", "Base"]
+__all__ = ["get_db", "get_read_db", "init_db", "migrate_online", "engine", "AsyncSession", "Base", "write_queue"]
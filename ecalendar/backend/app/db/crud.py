@@ -0,0 +1,97 @@
+"""Single-statement writes for the API routers.
+
+Each helper is one INSERT/UPDATE/DELETE; inserts and updates use RETURNING
+to get ids, defaults and onupdate timestamps back, so there is no
+flush/refresh round trip. Rows come back as Core rows, which the *Read
+schemas validate directly (``from_attributes``). Deletes leave tombstones
+for updated_since queries.
+"""
+from datetime import datetime
+
+from sqlalchemy import Row, case, delete, insert, select, update
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from ..models import Tombstone
+from .base import Base
+
+
+async def insert_row(db: AsyncSession, model: type[Base], values: dict) -> Row:
+    table = model.__table__
+    r = await db.execute(insert(table).values(values).returning(*table.c))
+    return r.one()
+
+
+async def insert_rows(db: AsyncSession, model: type[Base], rows: list[dict]) -> list[Row]:
+    """Insert several rows in one round of statements; results follow ``rows``."""
+    if not rows:
+        return []
+    table = model.__table__
+    r = await db.execute(insert(table).returning(*table.c, sort_by_parameter_order=True), rows)
+    return r.all()
+
+
+async def update_row(db: AsyncSession, model: type[Base], row_id: int, values: dict, *where) -> Row | None:
+    """Update one row by id (and ``where``); None if it does not exist."""
+    table = model.__table__
+    if not values:
+        r = await db.execute(select(*table.c).where(table.c.id == row_id, *where))
+        return r.one_or_none()
+    r = await db.execute(
+        update(table).where(table.c.id == row_id, *where).values(values).returning(*table.c)
+    )
+    return r.one_or_none()
+
+
+async def update_rows(db: AsyncSession, model: type[Base], changes: dict[int, dict], *where) -> list[Row]:
+    """Update several rows by id in one statement, each with its own values.
+
+    Every changed column becomes ``CASE id WHEN ... END``, falling back to
+    the current value for ids that do not set it. Only rows that exist
+    (and match ``where``) are returned, in no particular order.
+    """
+    table = model.__table__
+    columns = {name for values in changes.values() for name in values}
+    if not columns:
+        r = await db.execute(select(*table.c).where(table.c.id.in_(list(changes)), *where))
+        return r.all()
+    values = {}
+    for name in columns:
+        whens = {row_id: v[name] for row_id, v in changes.items() if name in v}
+        values[name] = case(whens, value=table.c.id, else_=table.c[name])
+    r = await db.execute(
+        update(table).where(table.c.id.in_(list(changes)), *where).values(values).returning(*table.c)
+    )
+    return r.all()
+
+
+async def update_many(db: AsyncSession, model: type[Base], ids: list[int], values: dict, *where) -> list[Row]:
+    """Apply the same values to several rows by id; returns the rows that exist."""
+    table = model.__table__
+    r = await db.execute(
+        update(table).where(table.c.id.in_(ids), *where).values(values).returning(*table.c)
+    )
+    return r.all()
+
+
+async def add_tombstones(db: AsyncSession, table_name: str, ids: list[int]) -> None:
+    if not ids:
+        return
+    now = datetime.utcnow()
+    stmt = sqlite_insert(Tombstone).values([{"table_name": table_name, "row_id": i, "deleted_at": now} for i in ids])
+    await db.execute(stmt.on_conflict_do_update(
+        index_elements=[Tombstone.table_name, Tombstone.row_id], set_={"deleted_at": now}
+    ))
+
+
+async def delete_rows(db: AsyncSession, model: type[Base], ids: list[int], *where) -> int:
+    table = model.__table__
+    r = await db.execute(delete(table).where(table.c.id.in_(ids), *where).returning(table.c.id))
+    deleted = r.scalars().all()
+    await add_tombstones(db, table.name, deleted)
+    return len(deleted)
+
+
+async def delete_row(db: AsyncSession, model: type[Base], row_id: int, *where) -> bool:
+    """Delete one row by id (and ``where``); False if it did not exist."""
+    return await delete_rows(db, model, [row_id], *where) > 0
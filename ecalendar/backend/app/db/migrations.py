@@ -0,0 +1,161 @@
+"""Versioned schema migrations, applied from the app lifespan.
+
+Each migration runs once and is recorded in ``schema_migrations`` with how
+long it took. Migrations the code depends on run before the app serves
+requests; ``online`` ones (secondary index builds) run in the background
+afterwards, one index per transaction, so requests are only held up for a
+single build at a time. Data migrations work in batches, committing after
+each, and are idempotent, so a restart picks up where an interrupted run
+stopped.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Float, Integer, String, Table, bindparam, func, select, text, update
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from .base import Base
+
+log = logging.getLogger(__name__)
+
+# Rows per batch for data migrations
+BATCH = 500
+
+schema_migrations = Table(
+    "schema_migrations",
+    Base.metadata,
+    Column("version", Integer, primary_key=True),
+    Column("name", String(100), nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+    Column("duration_ms", Float, nullable=False),
+)
+
+MIGRATIONS: list[dict] = []
+
+
+def migration(version: int, online: bool = False):
+    def register(fn: Callable[[AsyncEngine], Awaitable[None]]):
+        MIGRATIONS.append({"version": version, "name": fn.__name__, "online": online, "run": fn})
+        MIGRATIONS.sort(key=lambda m: m["version"])
+        return fn
+    return register
+
+
+async def _create_indexes(engine: AsyncEngine, table, names: list[str]) -> None:
+    for index in table.indexes:
+        if index.name in names:
+            async with engine.begin() as conn:
+                await conn.run_sync(index.create, checkfirst=True)
+            # Let queued requests run between builds
+            await asyncio.sleep(0)
+
+
+@migration(1)
+async def dedupe_sync_events(engine: AsyncEngine) -> None:
+    # Older imports could store the same UID twice; keep the newest row
+    while True:
+        async with engine.begin() as conn:
+            r = await conn.execute(text(
+                "SELECT id FROM events WHERE external_id IS NOT NULL AND id NOT IN "
+                "(SELECT MAX(id) FROM events WHERE external_id IS NOT NULL GROUP BY source, external_id) "
+                f"LIMIT {BATCH}"
+            ))
+            ids = r.scalars().all()
+            if not ids:
+                return
+            await conn.execute(
+                text(f"DELETE FROM events WHERE id IN ({', '.join(str(i) for i in ids)})")
+            )
+
+
+@migration(2)
+async def events_sync_unique_index(engine: AsyncEngine) -> None:
+    # Conflict target of the sync upsert, so it must exist before serving
+    from ..models import Event
+
+    await _create_indexes(engine, Event.__table__, ["uq_events_source_external_id"])
+
+
+@migration(3, online=True)
+async def events_range_indexes(engine: AsyncEngine) -> None:
+    from ..models import Event
+
+    await _create_indexes(engine, Event.__table__, ["ix_events_start_end", "ix_events_category_id"])
+
+
+@migration(4, online=True)
+async def chores_listing_index(engine: AsyncEngine) -> None:
+    from ..models import Chore
+
+    await _create_indexes(engine, Chore.__table__, ["ix_chores_due_date_created_at"])
+
+
+@migration(5)
+async def scope_caldav_event_keys(engine: AsyncEngine) -> None:
+    # Synced events were keyed on their bare UID, so one UID in two calendars
+    # or accounts shared a row, and a deletion in either removed it. Rows are
+    # re-keyed per account and calendar through each calendar's href map.
+    # A calendar whose UID another one claimed first is refetched in full to
+    # get its own row back. Rows no calendar claims (imports from before sync
+    # state was kept) are left as they are; the importer re-keys them when
+    # their account syncs again.
+    from ..models import CalendarSyncState, Event
+    from ..sync.caldav_sync import event_key
+    from ..sync.importer import caldav_source
+
+    events = Event.__table__
+    rekey = (
+        update(events)
+        .where(events.c.source == "caldav", events.c.external_id == bindparam("uid"))
+        .values(source=bindparam("new_source"), external_id=bindparam("key"))
+    )
+    async with engine.connect() as conn:
+        r = await conn.execute(select(
+            CalendarSyncState.id, CalendarSyncState.sync_id, CalendarSyncState.calendar_url, CalendarSyncState.hrefs,
+        ))
+        states = r.all()
+    for state in states:
+        source = caldav_source(state.sync_id)
+        uids = sorted(set(json.loads(state.hrefs or "{}").values()))
+        for i in range(0, len(uids), BATCH):
+            keys = [event_key(state.calendar_url, uid) for uid in uids[i:i + BATCH]]
+            async with engine.begin() as conn:
+                await conn.execute(rekey, [
+                    {"uid": uid, "new_source": source, "key": key} for uid, key in zip(uids[i:i + BATCH], keys)
+                ])
+                r = await conn.execute(
+                    select(func.count()).select_from(events)
+                    .where(events.c.source == source, events.c.external_id.in_(keys))
+                )
+                if r.scalar() < len(keys):
+                    await conn.execute(
+                        update(CalendarSyncState.__table__)
+                        .where(CalendarSyncState.id == state.id)
+                        .values(ctag=None, sync_token=None)
+                    )
+
+
+async def applied_versions(engine: AsyncEngine) -> set[int]:
+    async with engine.connect() as conn:
+        r = await conn.execute(select(schema_migrations.c.version))
+        return set(r.scalars().all())
+
+
+async def run_migrations(engine: AsyncEngine, online: bool = False) -> None:
+    """Apply pending migrations of one kind, in version order."""
+    done = await applied_versions(engine)
+    for m in MIGRATIONS:
+        if m["online"] != online or m["version"] in done:
+            continue
+        started = time.perf_counter()
+        await m["run"](engine)
+        duration_ms = (time.perf_counter() - started) * 1000
+        async with engine.begin() as conn:
+            await conn.execute(schema_migrations.insert().values(
+                version=m["version"], name=m["name"], applied_at=datetime.utcnow(), duration_ms=duration_ms,
+            ))
+        log.info("Applied migration %d %s in %.1f ms", m["version"], m["name"], duration_ms)
@@ -1,19 +1,60 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import DateTime, bindparam, event, inspect, select, text, update
+from sqlalchemy.schema import CreateColumn
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
-from sqlalchemy.pool import StaticPool
+from sqlalchemy.pool import AsyncAdaptedQueuePool, StaticPool
 
 from ..config import settings
 from .base import Base
+from .migrations import run_migrations
 
 
 db_path = str(settings.data_dir / "ecalendar.db")
 DATABASE_URL = f"sqlite+aiosqlite:///{db_path}"
 
-engine = create_async_engine(
-    DATABASE_URL,
-    connect_args={"check_same_thread": False},
-    poolclass=StaticPool,
-    echo=settings.debug,
-)
+
+def _tune(dbapi_conn, readonly: bool) -> None:
+    cursor = dbapi_conn.cursor()
+    if not readonly:
+        # Persistent in the file; readers then never block the writer
+        cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={settings.db_busy_timeout_ms}")
+    cursor.execute(f"PRAGMA cache_size=-{settings.db_cache_mb * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={settings.db_mmap_mb * 1024 * 1024}")
+    if readonly:
+        cursor.execute("PRAGMA query_only=ON")
+    cursor.close()
+
+
+if settings.db_wal:
+    # One writer connection, so SQLite's write lock is never contended
+    # between our own connections, and a small pool of readers that keep
+    # serving while a write transaction is open.
+    engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=1,
+        max_overflow=0,
+        echo=settings.debug,
+    )
+    read_engine = create_async_engine(
+        DATABASE_URL,
+        poolclass=AsyncAdaptedQueuePool,
+        pool_size=settings.db_read_connections,
+        max_overflow=0,
+        echo=settings.debug,
+    )
+    event.listen(engine.sync_engine, "connect", lambda conn, _: _tune(conn, readonly=False))
+    event.listen(read_engine.sync_engine, "connect", lambda conn, _: _tune(conn, readonly=True))
+else:
+    engine = read_engine = create_async_engine(
+        DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool,
+        echo=settings.debug,
+    )
 
 async_session = async_sessionmaker(
     engine,
@@ -23,10 +64,105 @@ async_session = async_sessionmaker(
     autoflush=False,
 )
 
+read_session = async_sessionmaker(
+    read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autocommit=False,
+    autoflush=False,
+)
+
+
+def _add_missing_columns(conn):
+    # create_all never alters existing tables; add new nullable columns so
+    # databases from older versions pick them up.
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        existing = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing:
+                ddl = CreateColumn(column).compile(dialect=conn.dialect)
+                conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {ddl}"))
+
+
+# R*Tree box for one events row: [start, end] in epoch seconds, open-ended
+# for recurring series. Boxes with end < start are clamped.
+_RTREE_BOX = (
+    "{row}.id, CAST(strftime('%s', {row}.start) AS INTEGER), "
+    "CASE WHEN {row}.recurrence IS NOT NULL THEN 1e12 "
+    "ELSE MAX(CAST(strftime('%s', {row}.start) AS INTEGER), CAST(strftime('%s', {row}.\"end\") AS INTEGER)) END"
+)
+
+
+def _ensure_interval_index(conn):
+    # Optional R*Tree for overlap queries. Dropped again when switched off
+    # so a stale tree is never used after re-enabling.
+    exists = conn.execute(
+        text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'events_rtree'")
+    ).first()
+    if not settings.event_interval_index:
+        if exists:
+            for trigger in ("events_rtree_ai", "events_rtree_au", "events_rtree_ad"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+            conn.execute(text("DROP TABLE events_rtree"))
+        return
+    if exists:
+        return
+    conn.execute(text("CREATE VIRTUAL TABLE events_rtree USING rtree(id, lo, hi)"))
+    conn.execute(text(
+        "CREATE TRIGGER events_rtree_ai AFTER INSERT ON events BEGIN "
+        f"INSERT INTO events_rtree VALUES ({_RTREE_BOX.format(row='new')}); END"
+    ))
+    conn.execute(text(
+        # Not INSERT OR REPLACE: an upsert's conflict clause would override it
+        'CREATE TRIGGER events_rtree_au AFTER UPDATE OF start, "end", recurrence ON events BEGIN '
+        "DELETE FROM events_rtree WHERE id = old.id; "
+        f"INSERT INTO events_rtree VALUES ({_RTREE_BOX.format(row='new')}); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER events_rtree_ad AFTER DELETE ON events BEGIN "
+        "DELETE FROM events_rtree WHERE id = old.id; END"
+    ))
+    conn.execute(text(f"INSERT INTO events_rtree SELECT {_RTREE_BOX.format(row='events')} FROM events"))
+
 
 async def init_db():
+    """Create tables and apply the migrations needed before serving.
+
+    Online migrations are left to ``migrate_online`` once the app is up.
+    """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(_add_missing_columns)
+    await run_migrations(engine)
+    async with engine.begin() as conn:
+        await conn.run_sync(_ensure_interval_index)
+        await conn.execute(
+            text("DELETE FROM tombstones WHERE deleted_at < :cutoff").bindparams(bindparam("cutoff", type_=DateTime)),
+            {"cutoff": datetime.utcnow() - timedelta(days=settings.tombstone_days)},
+        )
+    await _rotate_credentials()
+
+
+async def _rotate_credentials() -> None:
+    """Re-encrypt stored passwords still under an earlier key."""
+    from ..crypto import rotate
+    from ..models import CalendarSync
+
+    async with engine.begin() as conn:
+        r = await conn.execute(
+            select(CalendarSync.id, CalendarSync.token_encrypted).where(CalendarSync.token_encrypted.is_not(None))
+        )
+        for sync_id, token in r.all():
+            token = rotate(token)
+            if token is not None:
+                await conn.execute(
+                    update(CalendarSync).where(CalendarSync.id == sync_id).values(token_encrypted=token)
+                )
+
+
+async def migrate_online():
+    await run_migrations(engine, online=True)
 
 
 async def get_db():
@@ -39,3 +175,12 @@ async def get_db():
             raise
         finally:
             await session.close()
+
+
+async def get_read_db():
+    """Session on a read-only connection, for handlers that do not write."""
+    async with read_session() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -0,0 +1,89 @@
+"""Single writer task with group commit for API mutations.
+
+Handlers pass an ``async fn(session)`` to ``write_queue.run``. One task
+drains the queue: everything queued by the time it is free, including
+mutations that arrive while the previous batch commits, is applied in
+order in one session and committed together, so a burst of clicks costs
+a few transactions instead of one per request, and a lone write does not
+wait for company. If any
+of them fails the batch is rolled back and each is retried in its own
+transaction, so one bad request (a 404, a constraint error) only fails
+itself.
+"""
+import asyncio
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .session import async_session
+
+MAX_BATCH = 100
+
+WriteFn = Callable[[AsyncSession], Awaitable[Any]]
+
+
+class WriteQueue:
+    def __init__(self):
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self.batches = 0
+        self.writes = 0
+
+    async def run(self, fn: WriteFn) -> Any:
+        """Apply ``fn`` in the writer's session and return its result once committed."""
+        if self._task is None or self._task.done():
+            self._queue = asyncio.Queue()
+            self._task = asyncio.create_task(self._loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((fn, future))
+        return await future
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _loop(self) -> None:
+        while True:
+            batch = [await self._queue.get()]
+            # One pass of the event loop picks up requests dispatched together
+            await asyncio.sleep(0)
+            while len(batch) < MAX_BATCH and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            await self._apply(batch)
+
+    async def _apply(self, batch: list[tuple[WriteFn, asyncio.Future]]) -> None:
+        # Callers that gave up (client disconnected) are skipped
+        batch = [(fn, future) for fn, future in batch if not future.done()]
+        if not batch:
+            return
+        try:
+            async with async_session() as db:
+                results = []
+                for fn, _ in batch:
+                    results.append(await fn(db))
+                    # Later mutations in the batch see this one, as if sequential
+                    await db.flush()
+                await db.commit()
+        except Exception as e:
+            if len(batch) == 1:
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            for item in batch:
+                await self._apply([item])
+            return
+        self.batches += 1
+        self.writes += len(batch)
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+
+write_queue = WriteQueue()
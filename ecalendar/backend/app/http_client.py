@@ -0,0 +1,35 @@
+"""One HTTP client for upstream APIs, shared for the app's lifetime.
+
+Connections are kept alive between requests, so repeated calls to the
+same host skip the TCP and TLS handshakes; HTTP/2 is used when ``h2`` is
+installed (``httpx[http2]``), multiplexing concurrent requests over one
+connection.
+"""
+import httpx
+
+try:
+    import h2  # noqa: F401
+    HTTP2 = True
+except ImportError:
+    HTTP2 = False
+
+_client: httpx.AsyncClient | None = None
+
+
+def http_client() -> httpx.AsyncClient:
+    """The shared client, opened on first use if the lifespan has not."""
+    global _client
+    if _client is None or _client.is_closed:
+        _client = httpx.AsyncClient(
+            http2=HTTP2,
+            limits=httpx.Limits(max_keepalive_connections=10, keepalive_expiry=60),
+            timeout=10.0,
+        )
+    return _client
+
+
+async def close_http_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -1,24 +1,58 @@
-from contextlib import asynccontextmanager
+import asyncio
+import logging
+from contextlib import asynccontextmanager, suppress
 from pathlib import Path
 
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
 
+from .compression import CompressionMiddleware
 from .config import settings
-from .db import init_db
-from .models import Event, Chore, TodoList, TodoItem, Category, CalendarSync
-from .api import events, chores, lists, categories, weather, sync
+from .db import init_db, migrate_online, write_queue
+from .http_client import http_client, close_http_client
+from .models import Event, Chore, TodoList, TodoItem, Category, CalendarSync, CalendarSyncState, Geocode, Tombstone
+from .api import events, chores, lists, categories, weather, sync, dashboard, changes
+from .static import StaticIndex
+from .sync.scheduler import scheduler
 
 STATIC_DIR = Path("/usr/share/nginx/html")
+static_index = StaticIndex(STATIC_DIR)
+
+log = logging.getLogger(__name__)
+
+
+async def _migrate_online():
+    try:
+        await migrate_online()
+    except Exception:
+        # Retried on next start; the app works without secondary indexes
+        log.exception("Online migration failed")
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    static_index.scan()
+    http_client()
+    migrating = None
+    if settings.db_wal:
+        migrating = asyncio.create_task(_migrate_online())
+    else:
+        # One shared connection: a background migration would commit or roll
+        # back request transactions on it, so finish it before serving
+        await _migrate_online()
+    if settings.sync_scheduler:
+        scheduler.start()
     yield
-    pass
+    if migrating:
+        migrating.cancel()
+        with suppress(asyncio.CancelledError):
+            await migrating
+    await scheduler.stop()
+    await weather.weather_cache.stop()
+    await weather.forecast_cache.stop()
+    await close_http_client()
+    await write_queue.stop()
 
 
 app = FastAPI(
@@ -34,7 +68,9 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compress_min_bytes)
 
 app.include_router(events.router)
 app.include_router(chores.router)
@@ -42,6 +78,8 @@ app.include_router(lists.router)
 app.include_router(categories.router)
 app.include_router(weather.router)
 app.include_router(sync.router)
+app.include_router(dashboard.router)
+app.include_router(changes.router)
 
 
 @app.get("/api/health")
@@ -49,14 +87,14 @@ async def health():
     return {"status": "ok"}
 
 
-app.mount("/assets", StaticFiles(directory=STATIC_DIR / "assets"), name="assets")
-
-
-@app.get("/{full_path:path}")
-async def serve_spa(full_path: str):
+@app.api_route("/{full_path:path}", methods=["GET", "HEAD"])
+async def serve_spa(full_path: str, request: Request):
     if full_path.startswith("api/"):
         raise HTTPException(status_code=404, detail="Not Found")
-    file_path = STATIC_DIR / full_path
-    if file_path.is_file():
-        return FileResponse(file_path)
-    return FileResponse(STATIC_DIR / "index.html")
+    response = static_index.response(full_path, request)
+    # Client-side routes load the app; a missing asset is a real 404
+    if response is None and not full_path.startswith("assets/"):
+        response = static_index.response("index.html", request)
+    if response is None:
+        raise HTTPException(status_code=404, detail="Not Found")
+    return response
@@ -2,6 +2,8 @@ from .event import Event
 from .chore import Chore
 from .todo_list import TodoList, TodoItem
 from .category import Category
-from .calendar_sync import CalendarSync
+from .calendar_sync import CalendarSync, CalendarSyncState
+from .geocode import Geocode
+from .tombstone import Tombstone
 
-__all__ = ["Event", "Chore", "TodoList", "TodoItem", "Category", "CalendarSync"]
+__all__ = ["Event", "Chore", "TodoList", "TodoItem", "Category", "CalendarSync", "CalendarSyncState", "Geocode", "Tombstone"]
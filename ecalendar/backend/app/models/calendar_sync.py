@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, Integer
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -20,5 +20,25 @@ class CalendarSync(Base):
     token_encrypted: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     last_sync: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
     enabled: Mapped[bool] = mapped_column(default=True)
+    # Background sync interval; NULL uses settings.sync_interval_minutes
+    interval_minutes: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class CalendarSyncState(Base):
+    """Per-calendar change markers (ctag, RFC 6578 sync-token) for a CalendarSync."""
+
+    __tablename__ = "calendar_sync_states"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    sync_id: Mapped[int] = mapped_column(ForeignKey("calendar_syncs.id"), nullable=False)
+    calendar_url: Mapped[str] = mapped_column(Text, nullable=False)
+    ctag: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    sync_token: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # JSON object mapping resource href -> event UID, used to resolve deletions
+    hrefs: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    # Time range already downloaded (naive UTC); NULL means unbounded
+    window_start: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    window_end: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from sqlalchemy import String, Integer
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, Integer, DateTime
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -12,3 +15,7 @@ class Category(Base):
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     name: Mapped[str] = mapped_column(String(100), nullable=False)
     color: Mapped[str] = mapped_column(String(20), default="#6366f1")
+    # For updated_since queries; NULL on rows from before it was added
+    updated_at: Mapped[Optional[datetime]] = mapped_column(
+        DateTime, nullable=True, default=datetime.utcnow, onupdate=datetime.utcnow
+    )
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime, date
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, Date, ForeignKey, Integer, Boolean
+from sqlalchemy import String, Text, DateTime, Date, ForeignKey, Integer, Boolean, Index, text
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -11,6 +11,10 @@ from ..db.base import Base
 
 class Chore(Base):
     __tablename__ = "chores"
+    __table_args__ = (
+        # Listing order and pagination key: by due date, newest first within it
+        Index("ix_chores_due_date_created_at", "due_date", text("created_at DESC"), text("id DESC")),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -3,7 +3,7 @@ from __future__ import annotations
 from datetime import datetime
 from typing import Optional
 
-from sqlalchemy import String, Text, DateTime, ForeignKey, Integer
+from sqlalchemy import String, Text, DateTime, ForeignKey, Integer, Index, table, column
 from sqlalchemy.orm import Mapped, mapped_column
 
 from ..db.base import Base
@@ -11,6 +11,13 @@ from ..db.base import Base
 
 class Event(Base):
     __tablename__ = "events"
+    __table_args__ = (
+        # Sync upsert conflict target; local events leave both NULL
+        Index("uq_events_source_external_id", "source", "external_id", unique=True),
+        # Calendar views: range on start, end checked from the index, no sort
+        Index("ix_events_start_end", "start", "end"),
+        Index("ix_events_category_id", "category_id"),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
     title: Mapped[str] = mapped_column(String(255), nullable=False)
@@ -18,9 +25,17 @@ class Event(Base):
     start: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     end: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     all_day: Mapped[bool] = mapped_column(default=False)
-    recurrence: Mapped[Optional[str]] = mapped_column(String(100), nullable=True)
+    # iCalendar RRULE/EXDATE/RDATE lines, expanded by app.recurrence
+    recurrence: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     category_id: Mapped[Optional[int]] = mapped_column(ForeignKey("categories.id"), nullable=True)
-    external_id: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
+    # Synced events: "<calendar URL> <UID>", with source "caldav:<sync id>"
+    external_id: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
     source: Mapped[Optional[str]] = mapped_column(String(50), nullable=True)
     created_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
     updated_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Optional R*Tree over event spans (epoch seconds, recurring series open-ended),
+# kept in step with `events` by triggers. Created by init_db when
+# settings.event_interval_index is on; not part of Base.metadata.
+events_rtree = table("events_rtree", column("id"), column("lo"), column("hi"))
@@ -0,0 +1,20 @@
+from __future__ import annotations
+
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import String, DateTime, Float
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class Geocode(Base):
+    """Cached city lookups; lat/lon are NULL when the city was not found."""
+    __tablename__ = "geocode_cache"
+
+    # Normalized city name (see api.weather.geocode_key)
+    key: Mapped[str] = mapped_column(String(200), primary_key=True)
+    lat: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    lon: Mapped[Optional[float]] = mapped_column(Float, nullable=True)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,18 @@
+from __future__ import annotations
+
+from datetime import datetime
+
+from sqlalchemy import String, DateTime, Integer, Index
+from sqlalchemy.orm import Mapped, mapped_column
+
+from ..db.base import Base
+
+
+class Tombstone(Base):
+    """A deleted row, kept so updated_since queries can report the deletion."""
+    __tablename__ = "tombstones"
+    __table_args__ = (Index("ix_tombstones_table_deleted_at", "table_name", "deleted_at"),)
+
+    table_name: Mapped[str] = mapped_column(String(50), primary_key=True)
+    row_id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    deleted_at: Mapped[datetime] = mapped_column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,178 @@
+"""Gapped integer ranks for ``TodoItem.sort_order``.
+
+Items are spaced ``RANK_GAP`` apart, so appending an item or moving it
+between two neighbours writes only that item: it takes the midpoint of
+their ranks. When the neighbours are adjacent (or tied, as in lists from
+before ranks were gapped) there is no midpoint, and the items around that
+spot are respaced in the same transaction. A move that leaves less than
+``MIN_GAP`` on either side schedules a background respace, so the next
+move there finds room again.
+
+Respacing spreads a window of items evenly between the fixed items just
+outside it, widening the window until the spacing is at least
+``MIN_STEP``; only when the window covers the whole list is everything
+renumbered to multiples of ``RANK_GAP``. Repeated moves into one spot
+therefore rewrite a few dozen rows now and then, not the whole list.
+"""
+import asyncio
+import logging
+
+from sqlalchemy import and_, func, or_, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from .changes import record
+from .db import write_queue
+from .db.crud import update_row, update_rows
+from .models import TodoItem
+from .schemas import TodoItemRead
+
+log = logging.getLogger(__name__)
+
+RANK_GAP = 1024
+MIN_GAP = 8
+MIN_STEP = RANK_GAP // 8
+# Items taken on each side of the spot by the first respace attempt
+RESPACE_SPAN = 16
+# Items renumbered per UPDATE statement
+REBALANCE_CHUNK = 1000
+
+_pending: set[int] = set()
+_tasks: set[asyncio.Task] = set()
+
+
+async def append_rank(db: AsyncSession, list_id: int) -> int:
+    r = await db.execute(select(func.max(TodoItem.sort_order)).where(TodoItem.list_id == list_id))
+    top = r.scalar()
+    return RANK_GAP if top is None else top + RANK_GAP
+
+
+async def rebalance(db: AsyncSession, list_id: int) -> int:
+    """Respace a list to multiples of RANK_GAP, keeping its order.
+
+    Only items whose rank changes are written. Returns how many were.
+    """
+    r = await db.execute(
+        select(TodoItem.id, TodoItem.sort_order)
+        .where(TodoItem.list_id == list_id)
+        .order_by(TodoItem.sort_order, TodoItem.id)
+    )
+    changes = {
+        item_id: {"sort_order": n * RANK_GAP}
+        for n, (item_id, rank) in enumerate(r.all(), 1)
+        if rank != n * RANK_GAP
+    }
+    ids = list(changes)
+    for i in range(0, len(ids), REBALANCE_CHUNK):
+        await update_rows(db, TodoItem, {item_id: changes[item_id] for item_id in ids[i:i + REBALANCE_CHUNK]})
+    if changes:
+        record(db, "todo_items", "refresh")
+    return len(changes)
+
+
+async def respace(db: AsyncSession, list_id: int, around: int) -> int:
+    """Spread out the items ranked near ``around``. Returns how many were written."""
+    span = RESPACE_SPAN
+    item = select(TodoItem.id, TodoItem.sort_order).where(TodoItem.list_id == list_id)
+    while True:
+        r = await db.execute(
+            item.where(TodoItem.sort_order < around)
+            .order_by(TodoItem.sort_order.desc(), TodoItem.id.desc())
+            .limit(span + 1)
+        )
+        below = r.all()
+        r = await db.execute(
+            item.where(TodoItem.sort_order >= around).order_by(TodoItem.sort_order, TodoItem.id).limit(span + 1)
+        )
+        above = r.all()
+        # Items just outside the window keep their ranks
+        left = below.pop().sort_order if len(below) > span else None
+        right = above.pop().sort_order if len(above) > span else None
+        window = [row.id for row in reversed(below)] + [row.id for row in above]
+        if left is None and right is None:
+            return await rebalance(db, list_id)
+        if left is None:
+            start, step = right - (len(window) + 1) * RANK_GAP, RANK_GAP
+        elif right is None:
+            start, step = left, RANK_GAP
+        else:
+            start, step = left, (right - left) // (len(window) + 1)
+        if step >= MIN_STEP:
+            rows = await update_rows(
+                db, TodoItem, {item_id: {"sort_order": start + n * step} for n, item_id in enumerate(window, 1)}
+            )
+            record(db, "todo_items", "upsert", rows=[TodoItemRead.model_validate(row) for row in rows])
+            return len(window)
+        span *= 4
+
+
+def schedule_respace(list_id: int, around: int) -> None:
+    """Respace a spot through the writer once the current request is done."""
+    if list_id in _pending:
+        return
+    _pending.add(list_id)
+
+    async def run():
+        try:
+            await write_queue.run(lambda db: respace(db, list_id, around))
+        except Exception:
+            log.exception("Respacing list %d failed", list_id)
+        finally:
+            _pending.discard(list_id)
+
+    task = asyncio.create_task(run())
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+async def _neighbours(db: AsyncSession, list_id: int, item_id: int, after_id: int | None):
+    """Ranks of the items the moved item lands between (None at either end)."""
+    others = select(TodoItem.id, TodoItem.sort_order).where(
+        TodoItem.list_id == list_id, TodoItem.id != item_id
+    )
+    prev = None
+    if after_id is not None:
+        r = await db.execute(others.where(TodoItem.id == after_id))
+        prev = r.one_or_none()
+        if prev is None:
+            return None
+        others = others.where(
+            or_(
+                TodoItem.sort_order > prev.sort_order,
+                and_(TodoItem.sort_order == prev.sort_order, TodoItem.id > prev.id),
+            )
+        )
+    r = await db.execute(others.order_by(TodoItem.sort_order, TodoItem.id).limit(1))
+    nxt = r.one_or_none()
+    return (prev.sort_order if prev else None, nxt.sort_order if nxt else None)
+
+
+async def move_item(db: AsyncSession, list_id: int, item_id: int, after_id: int | None):
+    """Place an item right after ``after_id`` (first when None).
+
+    Returns the updated row, or None if either item is not in the list.
+    """
+    for attempt in range(3):
+        bounds = await _neighbours(db, list_id, item_id, after_id)
+        if bounds is None:
+            return None
+        prev, nxt = bounds
+        if prev is None and nxt is None:
+            rank = RANK_GAP
+        elif prev is None:
+            rank = nxt - RANK_GAP
+        elif nxt is None:
+            rank = prev + RANK_GAP
+        elif nxt - prev >= 2:
+            rank = (prev + nxt) // 2
+        else:
+            # No room between the neighbours: respace that spot and retry;
+            # ties (lists from before gapped ranks) need the whole list
+            if attempt == 0 and nxt > prev:
+                await respace(db, list_id, prev)
+            else:
+                await rebalance(db, list_id)
+            continue
+        if prev is not None and nxt is not None and min(rank - prev, nxt - rank) < MIN_GAP:
+            schedule_respace(list_id, rank)
+        return await update_row(db, TodoItem, item_id, {"sort_order": rank}, TodoItem.list_id == list_id)
+    raise RuntimeError(f"No rank available in list {list_id} after respacing")
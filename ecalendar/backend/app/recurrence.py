@@ -0,0 +1,183 @@
+"""Server-side recurrence expansion with an in-process occurrence cache.
+
+``Event.recurrence`` holds iCalendar recurrence lines (``RRULE:...``,
+``EXDATE:...``, ``RDATE:...``, one per line); a bare rule such as
+``FREQ=WEEKLY;BYDAY=MO`` is accepted as an RRULE. Times are expanded as
+naive wall-clock values, the same way event start/end are stored.
+
+Each series keeps its parsed rule and the occurrence starts computed so far
+for a contiguous range. Views inside that range are answered with a bisect;
+views outside it extend the range by whole months. Entries are dropped on
+write and also checked against the row's recurrence/start/updated_at, so a
+stale entry is never served.
+"""
+import re
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+from dateutil.rrule import rrulestr
+
+# Upper bound on occurrences produced per series per window
+MAX_OCCURRENCES = 1000
+# Series kept in the cache (LRU)
+MAX_SERIES = 5000
+
+_PARAMS = re.compile(r"^(EXDATE|RDATE);[^:]*:", re.IGNORECASE)
+
+
+def naive_utc(dt: datetime) -> datetime:
+    if dt.tzinfo is None:
+        return dt
+    return dt.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _rule_text(recurrence: str) -> str:
+    lines = []
+    for line in recurrence.replace("\r", "").split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        if ":" not in line:
+            line = f"RRULE:{line}"
+        # TZID/VALUE parameters would produce aware datetimes; values are
+        # treated as wall-clock like the event itself
+        lines.append(_PARAMS.sub(lambda m: f"{m.group(1).upper()}:", line))
+    return "\n".join(lines)
+
+
+def parse_rule(recurrence: str, dtstart: datetime):
+    """Parse recurrence lines into a dateutil rruleset, or None if invalid."""
+    try:
+        return rrulestr(
+            _rule_text(recurrence),
+            dtstart=dtstart.replace(tzinfo=None),
+            forceset=True,
+            ignoretz=True,
+            unfold=True,
+        )
+    except (ValueError, TypeError):
+        return None
+
+
+def _month_floor(dt: datetime) -> datetime:
+    return dt.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _month_ceil(dt: datetime) -> datetime:
+    floor = _month_floor(dt)
+    return (floor + timedelta(days=32)).replace(day=1)
+
+
+def _between(ruleset, lo: datetime, hi: datetime) -> tuple[list[datetime], datetime]:
+    """Occurrences in [lo, hi], and how far they are complete: ``hi``, or
+    the last one if MAX_OCCURRENCES cut the list short."""
+    out = []
+    for dt in ruleset.xafter(lo, inc=True):
+        if dt > hi:
+            break
+        if len(out) >= MAX_OCCURRENCES:
+            return out, out[-1]
+        out.append(dt)
+    return out, hi
+
+
+class _Series:
+    __slots__ = ("signature", "ruleset", "lo", "hi", "starts")
+
+    def __init__(self, signature, ruleset):
+        self.signature = signature
+        self.ruleset = ruleset
+        self.lo: datetime | None = None
+        self.hi: datetime | None = None
+        self.starts: list[datetime] = []
+
+
+class OccurrenceIndex:
+    def __init__(self, max_series: int = MAX_SERIES):
+        self._series: OrderedDict[int, _Series] = OrderedDict()
+        self._max_series = max_series
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, event_id: int | None = None) -> None:
+        """Forget one series, or every series when ``event_id`` is None."""
+        if event_id is None:
+            self._series.clear()
+        else:
+            self._series.pop(event_id, None)
+
+    def _entry(self, event) -> _Series | None:
+        signature = (event.recurrence, event.start, event.updated_at)
+        entry = self._series.get(event.id)
+        if entry is not None and entry.signature == signature:
+            self._series.move_to_end(event.id)
+            return entry
+        ruleset = parse_rule(event.recurrence, event.start)
+        if ruleset is None:
+            return None
+        entry = self._series[event.id] = _Series(signature, ruleset)
+        while len(self._series) > self._max_series:
+            self._series.popitem(last=False)
+        return entry
+
+    def _fill(self, entry: _Series, lo: datetime, hi: datetime) -> None:
+        """Replace the cached range with one covering [lo, hi].
+
+        Coverage ends where MAX_OCCURRENCES cut the expansion short, never
+        past it. A series too dense for whole months is expanded from
+        ``lo`` itself, so the view still gets its first occurrences.
+        """
+        new_lo = _month_floor(lo)
+        starts, reached = _between(entry.ruleset, new_lo, _month_ceil(hi))
+        if reached < hi:
+            new_lo = lo
+            starts, reached = _between(entry.ruleset, lo, _month_ceil(hi))
+        entry.starts, entry.lo, entry.hi = starts, new_lo, reached
+
+    def _extend(self, entry: _Series, lo: datetime, hi: datetime) -> None:
+        """Grow the cached range to cover [lo, hi], keeping it contiguous."""
+        if entry.lo is None or lo > entry.hi or hi < entry.lo:
+            self._fill(entry, lo, hi)
+            return
+        new_lo = _month_floor(lo)
+        if new_lo < entry.lo:
+            left, reached = _between(entry.ruleset, new_lo, entry.lo)
+            if reached < entry.lo:
+                # Would leave a hole before the cached range
+                self._fill(entry, lo, hi)
+                return
+            entry.starts = sorted(set(left + entry.starts))
+            entry.lo = new_lo
+        if hi > entry.hi:
+            # Starts at or before lo, so the view gets MAX_OCCURRENCES
+            # occurrences even if this is cut short
+            right, entry.hi = _between(entry.ruleset, entry.hi, _month_ceil(hi))
+            entry.starts = sorted(set(entry.starts + right))
+
+    def occurrences(self, event, start: datetime, end: datetime) -> list[datetime] | None:
+        """Occurrence starts of ``event`` overlapping [start, end].
+
+        Returns None when the recurrence cannot be parsed.
+        """
+        entry = self._entry(event)
+        if entry is None:
+            return None
+        duration = event.end - event.start
+        lo = start - duration
+        hi = end
+        # Answered from the cache if it covers the view, or at least its
+        # first MAX_OCCURRENCES occurrences
+        if entry.lo is not None and entry.lo <= lo and (
+            hi <= entry.hi or len(entry.starts) - bisect_left(entry.starts, lo) >= MAX_OCCURRENCES
+        ):
+            self.hits += 1
+        else:
+            self.misses += 1
+            self._extend(entry, lo, hi)
+        i = bisect_left(entry.starts, lo)
+        j = bisect_right(entry.starts, hi)
+        return entry.starts[i:min(j, i + MAX_OCCURRENCES)]
+
+
+occurrence_index = OccurrenceIndex()
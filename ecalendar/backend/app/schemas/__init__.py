@@ -1,13 +1,17 @@
 from .event import EventCreate, EventUpdate, EventRead
-from .chore import ChoreCreate, ChoreUpdate, ChoreRead
-from .todo import TodoListCreate, TodoListRead, TodoItemCreate, TodoItemUpdate, TodoItemRead
+from .chore import ChoreCreate, ChoreUpdate, ChoreBulkComplete, ChoreBulkDelete, ChoreRead
+from .todo import (
+    TodoListCreate, TodoListRead, TodoItemCreate, TodoItemUpdate, TodoItemBulkUpdate, TodoItemMove,
+    TodoItemRead, TodoListWithItems, TodoListWithCounts,
+)
 from .category import CategoryCreate, CategoryRead
-from .weather import WeatherResponse
+from .weather import WeatherResponse, HourlyForecast, DailyForecast, LocationForecast
 
 __all__ = [
     "EventCreate", "EventUpdate", "EventRead",
-    "ChoreCreate", "ChoreUpdate", "ChoreRead",
-    "TodoListCreate", "TodoListRead", "TodoItemCreate", "TodoItemUpdate", "TodoItemRead",
+    "ChoreCreate", "ChoreUpdate", "ChoreBulkComplete", "ChoreBulkDelete", "ChoreRead",
+    "TodoListCreate", "TodoListRead", "TodoItemCreate", "TodoItemUpdate", "TodoItemBulkUpdate", "TodoItemMove",
+    "TodoItemRead", "TodoListWithItems", "TodoListWithCounts",
     "CategoryCreate", "CategoryRead",
-    "WeatherResponse",
+    "WeatherResponse", "HourlyForecast", "DailyForecast", "LocationForecast",
 ]
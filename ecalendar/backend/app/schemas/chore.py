@@ -21,6 +21,15 @@ class ChoreUpdate(BaseModel):
     category_id: int | None = None
 
 
+class ChoreBulkComplete(BaseModel):
+    ids: list[int]
+    completed: bool = True
+
+
+class ChoreBulkDelete(BaseModel):
+    ids: list[int]
+
+
 class ChoreRead(BaseModel):
     id: int
     title: str
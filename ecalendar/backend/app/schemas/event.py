@@ -35,5 +35,7 @@ class EventRead(BaseModel):
     category_id: int | None
     created_at: datetime
     updated_at: datetime
+    # Original start of this occurrence when a recurring series is expanded
+    recurrence_id: datetime | None = None
 
     model_config = {"from_attributes": True}
@@ -23,7 +23,8 @@ class TodoListRead(BaseModel):
 
 class TodoItemCreate(BaseModel):
     title: str
-    sort_order: int = 0
+    # Omitted: append after the last item
+    sort_order: int | None = None
 
 
 class TodoItemUpdate(BaseModel):
@@ -32,6 +33,15 @@ class TodoItemUpdate(BaseModel):
     sort_order: int | None = None
 
 
+class TodoItemBulkUpdate(TodoItemUpdate):
+    id: int
+
+
+class TodoItemMove(BaseModel):
+    # Item to place this one after; None moves it to the top
+    after_id: int | None = None
+
+
 class TodoItemRead(BaseModel):
     id: int
     list_id: int
@@ -42,3 +52,12 @@ class TodoItemRead(BaseModel):
     updated_at: datetime
 
     model_config = {"from_attributes": True}
+
+
+class TodoListWithItems(TodoListRead):
+    items: list[TodoItemRead] = []
+
+
+class TodoListWithCounts(TodoListRead):
+    open_count: int = 0
+    done_count: int = 0
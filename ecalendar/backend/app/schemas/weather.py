@@ -1,3 +1,5 @@
+from datetime import date, datetime
+
 from pydantic import BaseModel
 
 
@@ -9,3 +11,32 @@ class WeatherResponse(BaseModel):
     humidity: int
     wind_speed: float
     city: str
+
+
+class HourlyForecast(BaseModel):
+    # Local time at the location
+    time: datetime
+    temp: float
+    description: str
+    icon: str
+    precipitation_probability: int | None
+    wind_speed: float
+
+
+class DailyForecast(BaseModel):
+    date: date
+    temp_max: float
+    temp_min: float
+    description: str
+    icon: str
+    precipitation_sum: float | None
+    precipitation_probability: int | None
+
+
+class LocationForecast(BaseModel):
+    lat: float
+    lon: float
+    timezone: str
+    current: WeatherResponse
+    hourly: list[HourlyForecast]
+    daily: list[DailyForecast]
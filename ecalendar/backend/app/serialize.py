@@ -0,0 +1,45 @@
+"""JSON straight from result rows for the list endpoints.
+
+The list queries select just the columns of their read schema and hand
+back plain dicts; ``RowsResponse`` encodes them with orjson in one call.
+Returning a response object makes FastAPI skip its ``response_model``
+validation, which stays on the routes for the OpenAPI schema only, so no
+ORM object or pydantic model is built per row. Column values encode the
+way the schemas do: naive datetimes as ISO 8601 without an offset, dates
+as ISO dates.
+"""
+from typing import Any
+
+import orjson
+from fastapi import Response
+from pydantic import BaseModel
+from sqlalchemy import Column
+
+from .db.base import Base
+
+
+def read_columns(model: type[Base], schema: type[BaseModel]) -> list[Column]:
+    """Columns of ``model`` that ``schema`` reads, in the schema's field order."""
+    table = model.__table__
+    return [table.c[name] for name in schema.model_fields if name in table.c]
+
+
+def as_dicts(rows) -> list[dict]:
+    return [row._asdict() for row in rows]
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json")
+    raise TypeError(f"Cannot encode {type(obj).__name__}")
+
+
+def dumps(content: Any) -> bytes:
+    return orjson.dumps(content, default=_default)
+
+
+class RowsResponse(Response):
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return dumps(content)
@@ -0,0 +1,88 @@
+"""The built SPA, served from an in-memory index of its directory.
+
+The directory is scanned once at startup for each file's type, stat and
+ETag, and for the precompressed siblings (``app.js.br``, ``app.js.gz``)
+the image build writes next to it. A request is then a dict lookup; the
+filesystem is only touched to stream the chosen file.
+
+Vite puts a content hash in every name under ``assets/``, so those are
+cached for a year as immutable. Everything else (index.html) is
+revalidated on each load and answered 304 while unchanged.
+"""
+import mimetypes
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from fastapi import Request, Response
+from fastapi.responses import FileResponse
+
+from .compression import accepted_encodings
+
+# Content-Encoding -> suffix of the precompressed sibling, preferred first
+PRECOMPRESSED = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+
+@dataclass
+class StaticFile:
+    path: Path
+    stat: os.stat_result
+    media_type: str
+    etag: str
+    cache_control: str
+    # Content-Encoding -> (precompressed file, its stat)
+    variants: dict[str, tuple[Path, os.stat_result]] = field(default_factory=dict)
+
+
+class StaticIndex:
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self.files: dict[str, StaticFile] = {}
+
+    def scan(self) -> None:
+        """(Re)build the index; an absent directory leaves it empty."""
+        files = {}
+        for root, _, names in os.walk(self.directory):
+            present = set(names)
+            for name in names:
+                if any(name.endswith(suffix) and name[:-len(suffix)] in present
+                       for suffix in PRECOMPRESSED.values()):
+                    continue
+                path = Path(root, name)
+                rel = path.relative_to(self.directory).as_posix()
+                stat = path.stat()
+                entry = StaticFile(
+                    path=path,
+                    stat=stat,
+                    media_type=mimetypes.guess_type(name)[0] or "application/octet-stream",
+                    etag=f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"',
+                    cache_control=IMMUTABLE if rel.startswith("assets/") else REVALIDATE,
+                )
+                for encoding, suffix in PRECOMPRESSED.items():
+                    if name + suffix in present:
+                        variant = Path(root, name + suffix)
+                        entry.variants[encoding] = (variant, variant.stat())
+                files[rel] = entry
+        self.files = files
+
+    def response(self, path: str, request: Request) -> Response | None:
+        """The file at ``path`` (relative), or None if there is none."""
+        entry = self.files.get(path)
+        if entry is None:
+            return None
+        accepted = accepted_encodings(request.headers.get("accept-encoding", ""))
+        encoding = next((e for e in entry.variants if e in accepted), None)
+        # Each encoding is its own representation to caches
+        etag = entry.etag if encoding is None else f'{entry.etag[:-1]}-{encoding}"'
+        headers = {"ETag": etag, "Cache-Control": entry.cache_control}
+        if entry.variants:
+            headers["Vary"] = "Accept-Encoding"
+        if etag in [t.strip() for t in request.headers.get("if-none-match", "").split(",")]:
+            return Response(status_code=304, headers=headers)
+        file, stat = entry.path, entry.stat
+        if encoding is not None:
+            file, stat = entry.variants[encoding]
+            headers["Content-Encoding"] = encoding
+        return FileResponse(file, stat_result=stat, media_type=entry.media_type, headers=headers)
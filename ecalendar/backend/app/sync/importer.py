@@ -0,0 +1,257 @@
+"""Applies CalDAV fetch results to the database and tracks per-calendar state."""
+import asyncio
+import json
+from collections.abc import Callable
+from datetime import datetime, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import bindparam, delete, or_, select, update
+from sqlalchemy.dialects.sqlite import insert
+
+from ..changes import record
+from ..config import settings
+from ..db.crud import add_tombstones
+from ..models import Event, CalendarSync, CalendarSyncState
+from ..recurrence import occurrence_index
+from .caldav_sync import event_key, sync_caldav, Window
+
+# Rows per INSERT statement; keeps bound parameters under SQLite's limit
+UPSERT_CHUNK = 100
+# Event.source of rows imported before keys were scoped per account and
+# calendar; their external_id is the bare UID
+LEGACY_SOURCE = "caldav"
+
+
+def sync_horizon(now: datetime | None = None) -> Window:
+    """The configured (start, end) sync window around now, naive UTC."""
+    now = now or datetime.utcnow()
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    start = today - timedelta(days=settings.sync_past_days) if settings.sync_past_days > 0 else None
+    end = today + timedelta(days=settings.sync_future_days) if settings.sync_future_days > 0 else None
+    return (start, end)
+
+
+def caldav_source(sync_id: int) -> str:
+    """Event.source of one account's synced events."""
+    return f"caldav:{sync_id}"
+
+
+async def upsert_events(db: AsyncSession, source: str, events: list[dict]) -> tuple[int, int]:
+    """Insert or update events keyed on (source, external_id).
+
+    Existing keys are read in one query and rows are written with
+    INSERT ... ON CONFLICT DO UPDATE in chunks. Callers pass sync batches,
+    which keeps the key lookup under SQLite's parameter limit. A stored
+    row is only rewritten if one of its columns differs, so an unchanged
+    event keeps its updated_at and a sync that changed nothing does not
+    move deltas or ETags. Returns (inserted, updated), counting rows
+    actually written.
+    """
+    rows: dict[str, dict] = {}
+    for ed in events:
+        if ed.get("external_id"):
+            # A later VEVENT for the same UID wins, as it would row-by-row
+            rows[ed["external_id"]] = {**ed, "source": source}
+    if not rows:
+        return 0, 0
+
+    r = await db.execute(
+        select(Event.external_id).where(Event.source == source, Event.external_id.in_(list(rows)))
+    )
+    existing = set(r.scalars().all())
+
+    now = datetime.utcnow()
+    values = [{**row, "created_at": now, "updated_at": now} for row in rows.values()]
+    written: list[str] = []
+    for i in range(0, len(values), UPSERT_CHUNK):
+        chunk = values[i:i + UPSERT_CHUNK]
+        stmt = insert(Event).values(chunk)
+        columns = [c for c in chunk[0] if c not in ("source", "external_id", "created_at")]
+        compared = [c for c in columns if c != "updated_at"]
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Event.source, Event.external_id],
+            set_={c: stmt.excluded[c] for c in columns},
+            where=or_(*(Event.__table__.c[c].is_distinct_from(stmt.excluded[c]) for c in compared)),
+        ).returning(Event.external_id)
+        r = await db.execute(stmt)
+        written.extend(r.scalars().all())
+    if not written:
+        return 0, 0
+    record(db, "events", "refresh")
+    if any(rows[uid].get("recurrence") for uid in written):
+        occurrence_index.invalidate()
+    updated = sum(1 for uid in written if uid in existing)
+    return len(written) - updated, updated
+
+
+async def adopt_legacy_events(db: AsyncSession, source: str, keys: list[str]) -> int:
+    """Move LEGACY_SOURCE rows for the UIDs in ``keys`` to ``source`` and
+    their scoped key, so syncing them again updates them in place.
+
+    A UID in several calendars goes to the first one that syncs it.
+    Returns the number of rows moved.
+    """
+    events = Event.__table__
+    stmt = (
+        update(events)
+        .where(events.c.source == LEGACY_SOURCE, events.c.external_id == bindparam("uid"))
+        .values(source=source, external_id=bindparam("key"))
+    )
+    # Keys are "<calendar URL> <UID>" (caldav_sync.event_key)
+    r = await db.execute(stmt, [{"uid": key.partition(" ")[2], "key": key} for key in set(keys)])
+    if r.rowcount:
+        record(db, "events", "refresh")
+    return max(r.rowcount, 0)
+
+
+async def delete_events(db: AsyncSession, source: str, external_ids: list[str]) -> int:
+    """Delete events that vanished upstream. Returns the number of rows removed."""
+    ids = list(set(external_ids))
+    deleted = 0
+    if ids:
+        occurrence_index.invalidate()
+    for i in range(0, len(ids), UPSERT_CHUNK):
+        r = await db.execute(
+            delete(Event).where(
+                Event.source == source,
+                Event.external_id.in_(ids[i:i + UPSERT_CHUNK]),
+            ).returning(Event.id)
+        )
+        row_ids = r.scalars().all()
+        await add_tombstones(db, "events", row_ids)
+        deleted += len(row_ids)
+    if deleted:
+        record(db, "events", "refresh")
+    return deleted
+
+
+async def _load_state(db: AsyncSession, sync_id: int) -> dict[str, CalendarSyncState]:
+    r = await db.execute(select(CalendarSyncState).where(CalendarSyncState.sync_id == sync_id))
+    return {s.calendar_url: s for s in r.scalars().all()}
+
+
+def _state_to_dict(rows: dict[str, CalendarSyncState]) -> dict[str, dict]:
+    return {
+        url: {
+            "ctag": s.ctag,
+            "sync_token": s.sync_token,
+            "hrefs": json.loads(s.hrefs or "{}"),
+            "window": (s.window_start, s.window_end),
+        }
+        for url, s in rows.items()
+    }
+
+
+async def _save_state(
+    db: AsyncSession, sync_id: int, rows: dict[str, CalendarSyncState], state: dict[str, dict]
+) -> int:
+    """Store per-calendar state and drop calendars the account no longer has.
+
+    Events of a vanished calendar are deleted with it. Returns the number of
+    events removed.
+    """
+    for url, st in state.items():
+        row = rows.pop(url, None)
+        if row is None:
+            row = CalendarSyncState(sync_id=sync_id, calendar_url=url)
+            db.add(row)
+        row.ctag = st.get("ctag")
+        row.sync_token = st.get("sync_token")
+        row.hrefs = json.dumps(st.get("hrefs") or {})
+        row.window_start, row.window_end = st.get("window") or (None, None)
+    # Calendars that disappeared from the account, and their events
+    deleted = 0
+    for row in rows.values():
+        r = await db.execute(
+            delete(Event).where(
+                Event.source == caldav_source(sync_id),
+                Event.external_id.startswith(event_key(row.calendar_url, ""), autoescape=True),
+            ).returning(Event.id)
+        )
+        row_ids = r.scalars().all()
+        await add_tombstones(db, "events", row_ids)
+        deleted += len(row_ids)
+        await db.delete(row)
+    if deleted:
+        occurrence_index.invalidate()
+        record(db, "events", "refresh")
+    return deleted
+
+
+async def import_caldav(
+    db: AsyncSession, cs: CalendarSync, password: str, window: Window | None = None,
+    progress: Callable[[dict], None] | None = None, write_lock: asyncio.Lock | None = None,
+    commit: bool = False,
+) -> dict:
+    """Fetch changes for one CalendarSync and apply them as they stream in.
+
+    Event batches are upserted while the fetch is still running. Returns
+    {"imported", "updated", "deleted", "stats", "errors"}; fetch failures
+    raise. ``progress`` receives fetch and upsert counters. ``write_lock``
+    serialises this import's database work with other imports, and
+    ``commit`` commits after each batch so the lock is not held across a
+    long transaction.
+    """
+    lock = write_lock or asyncio.Lock()
+    source = caldav_source(cs.id)
+    counts = {"parsed": 0, "inserted": 0, "updated": 0}
+    legacy = False
+
+    async def write(batch: list[dict]) -> None:
+        counts["parsed"] += len(batch)
+        if progress:
+            progress({"events_parsed": counts["parsed"]})
+        async with lock:
+            if legacy:
+                await adopt_legacy_events(db, source, [event["external_id"] for event in batch])
+            inserted, updated = await upsert_events(db, source, batch)
+            if commit:
+                await db.commit()
+        counts["inserted"] += inserted
+        counts["updated"] += updated
+        if progress:
+            progress({"rows_upserted": counts["inserted"] + counts["updated"]})
+
+    async with lock:
+        state_rows = await _load_state(db, cs.id)
+        r = await db.execute(select(Event.id).where(Event.source == LEGACY_SOURCE).limit(1))
+        legacy = r.first() is not None
+        if commit:
+            # Hand the connection back while the fetch runs
+            await db.commit()
+    fetched = await sync_caldav(
+        cs.url, cs.username, password, _state_to_dict(state_rows), window, progress, write
+    )
+    async with lock:
+        deleted = await delete_events(db, source, fetched["deleted"])
+        deleted += await _save_state(db, cs.id, state_rows, fetched["state"])
+        cs.last_sync = datetime.utcnow()
+        await db.flush()
+        if commit:
+            await db.commit()
+
+    return {
+        "imported": counts["inserted"],
+        "updated": counts["updated"],
+        "deleted": deleted,
+        "stats": fetched["stats"],
+        "errors": fetched["errors"],
+    }
+
+
+async def import_caldav_many(
+    db: AsyncSession, syncs: list[tuple[CalendarSync, str]], window: Window | None = None,
+    commit: bool = False,
+) -> list[dict]:
+    """Import several accounts concurrently over one session.
+
+    Results follow the order of ``syncs``; an account whose fetch failed gets
+    {"error": message} instead of counts.
+    """
+    lock = asyncio.Lock()
+    results = await asyncio.gather(
+        *(import_caldav(db, cs, password, window, write_lock=lock, commit=commit) for cs, password in syncs),
+        return_exceptions=True,
+    )
+    return [{"error": str(r)} if isinstance(r, Exception) else r for r in results]
+
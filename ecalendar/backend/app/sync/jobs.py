@@ -0,0 +1,177 @@
+"""Background sync jobs with progress reporting.
+
+A job imports one CalendarSync in its own session. Triggers for an account
+that already has a running job are coalesced onto that job. Progress
+snapshots are pushed to subscribers (the SSE endpoint) as they change.
+Ranges requested outside what has been downloaded are queued here too
+(``ensure_window``).
+"""
+import asyncio
+import uuid
+from collections import OrderedDict
+from collections.abc import AsyncIterator
+from datetime import datetime, timezone
+
+from sqlalchemy import select
+
+from ..crypto import decrypt
+from ..db.session import async_session, read_session
+from ..models import CalendarSync, CalendarSyncState
+from .caldav_sync import Window
+from .importer import import_caldav
+
+# Finished jobs kept around for status queries
+MAX_FINISHED_JOBS = 50
+
+
+class SyncJob:
+    def __init__(self, sync_id: int, name: str):
+        self.id = uuid.uuid4().hex
+        self.sync_id = sync_id
+        self.name = name
+        self.status = "running"
+        self.started = datetime.utcnow()
+        self.finished: datetime | None = None
+        self.progress = {
+            "calendars_total": 0,
+            "calendars_done": 0,
+            "events_parsed": 0,
+            "rows_upserted": 0,
+        }
+        self.errors: list[str] = []
+        self.result: dict | None = None
+        self.task: asyncio.Task | None = None
+        self._subscribers: set[asyncio.Queue] = set()
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    def snapshot(self) -> dict:
+        return {
+            "id": self.id,
+            "sync_id": self.sync_id,
+            "name": self.name,
+            "status": self.status,
+            "started": self.started,
+            "finished": self.finished,
+            "progress": dict(self.progress),
+            "errors": list(self.errors),
+            "result": self.result,
+        }
+
+    def update(self, changes: dict) -> None:
+        self.progress.update(changes)
+        self._publish()
+
+    def _publish(self) -> None:
+        snap = self.snapshot()
+        for queue in self._subscribers:
+            queue.put_nowait(snap)
+
+    async def stream(self) -> AsyncIterator[dict]:
+        """Yield the current snapshot, then every change until the job ends."""
+        queue: asyncio.Queue = asyncio.Queue()
+        self._subscribers.add(queue)
+        try:
+            snap = self.snapshot()
+            yield snap
+            while not self.done:
+                snap = await queue.get()
+                yield snap
+            # Drain anything published alongside the final state
+            while not queue.empty():
+                yield queue.get_nowait()
+        finally:
+            self._subscribers.discard(queue)
+
+
+class SyncJobs:
+    def __init__(self):
+        self.jobs: OrderedDict[str, SyncJob] = OrderedDict()
+        self._active: dict[int, SyncJob] = {}
+        self._write_lock = asyncio.Lock()
+
+    def get(self, job_id: str) -> SyncJob | None:
+        return self.jobs.get(job_id)
+
+    def submit(self, cs: CalendarSync, password: str, window: Window | None = None) -> SyncJob:
+        """Start a job for ``cs``, or return the one already running for it."""
+        job = self._active.get(cs.id)
+        if job is not None:
+            return job
+        job = SyncJob(cs.id, cs.name)
+        self.jobs[job.id] = job
+        self._active[cs.id] = job
+        job.task = asyncio.create_task(self._run(job, password, window))
+        self._prune()
+        return job
+
+    async def _run(self, job: SyncJob, password: str, window: Window | None) -> None:
+        try:
+            async with async_session() as db:
+                # The writer connection is only taken under the lock and
+                # handed back before waiting for it again: the job holding
+                # the lock may be waiting for that connection
+                async with self._write_lock:
+                    cs = await db.get(CalendarSync, job.sync_id)
+                    await db.commit()
+                if cs is None:
+                    raise LookupError("Calendar sync not found")
+                result = await import_caldav(db, cs, password, window, job.update, self._write_lock, commit=True)
+            job.result = result
+            job.errors = list(result["errors"])
+            job.status = "ok"
+        except Exception as e:
+            job.errors.append(f"CalDAV sync failed: {e}")
+            job.status = "error"
+        finally:
+            job.finished = datetime.utcnow()
+            self._active.pop(job.sync_id, None)
+            job._publish()
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:max(len(finished) - MAX_FINISHED_JOBS, 0)]:
+            del self.jobs[job_id]
+
+
+sync_jobs = SyncJobs()
+
+
+def _covers(row, start: datetime, end: datetime) -> bool:
+    if row.window_start is not None and start < row.window_start:
+        return False
+    if row.window_end is not None and end > row.window_end:
+        return False
+    return True
+
+
+async def ensure_window(start: datetime, end: datetime) -> None:
+    """Queue a sync of [start, end] for accounts that have not downloaded it.
+
+    Coverage comes from one query over the accounts and their calendars'
+    window columns. Missing ranges are fetched by a background job, so the
+    request never waits on CalDAV: it serves what is local, and the events
+    arrive through the change feed. An account already syncing keeps its
+    running job, and a later request for the range queues it then.
+    """
+    if start.tzinfo is not None:
+        start = start.astimezone(timezone.utc).replace(tzinfo=None)
+    if end.tzinfo is not None:
+        end = end.astimezone(timezone.utc).replace(tzinfo=None)
+    async with read_session() as db:
+        r = await db.execute(
+            select(CalendarSync, CalendarSyncState.window_start, CalendarSyncState.window_end)
+            .join(CalendarSyncState, CalendarSyncState.sync_id == CalendarSync.id)
+            .where(
+                CalendarSync.source == "caldav",
+                CalendarSync.enabled.is_(True),
+                CalendarSync.token_encrypted.is_not(None),
+            )
+        )
+        missing = {row.CalendarSync.id: row.CalendarSync for row in r.all() if not _covers(row, start, end)}
+    for cs in missing.values():
+        password = decrypt(cs.token_encrypted)
+        if password is not None:
+            sync_jobs.submit(cs, password, (start, end))
@@ -0,0 +1,138 @@
+"""Background CalDAV sync driven by enabled CalendarSync rows.
+
+Each enabled account with stored credentials is synced on its own interval
+(``CalendarSync.interval_minutes`` or ``settings.sync_interval_minutes``),
+with jitter so accounts drift apart, and exponential backoff after failures.
+Runs go through the shared job queue, so a scheduled run and a manual
+trigger for the same account coalesce. A tick only starts runs: each is
+followed by a task of its own, so a slow account never delays the others,
+and an account still running when it comes due again is left to finish.
+Schedule status lives in memory and is exposed through the sync API.
+"""
+import asyncio
+import logging
+import random
+from datetime import datetime, timedelta
+
+from sqlalchemy import select
+
+from ..config import settings
+from ..crypto import decrypt
+from ..db.session import read_session
+from ..models import CalendarSync
+from .importer import sync_horizon
+from .jobs import SyncJob, sync_jobs
+
+log = logging.getLogger(__name__)
+
+TICK_SECONDS = 30
+JITTER = 0.1
+BACKOFF_BASE_SECONDS = 60
+BACKOFF_MAX_SECONDS = 6 * 3600
+
+
+def _jitter(seconds: float) -> timedelta:
+    return timedelta(seconds=seconds * (1 + random.uniform(-JITTER, JITTER)))
+
+
+class SyncScheduler:
+    def __init__(self):
+        self.jobs: dict[int, dict] = {}
+        self._task: asyncio.Task | None = None
+        # sync_id -> task following that account's run
+        self._running: dict[int, asyncio.Task] = {}
+
+    def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        tasks = list(self._running.values())
+        if self._task is not None:
+            tasks.append(self._task)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                log.exception("Sync scheduler tick failed")
+            await asyncio.sleep(TICK_SECONDS)
+
+    def _interval(self, cs: CalendarSync) -> float:
+        return 60 * (cs.interval_minutes or settings.sync_interval_minutes)
+
+    def _job(self, cs: CalendarSync, now: datetime) -> dict:
+        job = self.jobs.get(cs.id)
+        if job is None:
+            if cs.last_sync:
+                next_run = cs.last_sync + _jitter(self._interval(cs))
+            else:
+                next_run = now + timedelta(seconds=random.uniform(0, TICK_SECONDS))
+            job = self.jobs[cs.id] = {
+                "sync_id": cs.id,
+                "status": "idle",
+                "last_run": cs.last_sync,
+                "last_duration": None,
+                "next_run": next_run,
+                "failures": 0,
+                "last_error": None,
+                "last_result": None,
+            }
+        job["name"] = cs.name
+        return job
+
+    async def tick(self, now: datetime | None = None) -> None:
+        """Start a run for every account that is due and not still running."""
+        now = now or datetime.utcnow()
+        async with read_session() as db:
+            r = await db.execute(
+                select(CalendarSync).where(
+                    CalendarSync.source == "caldav",
+                    CalendarSync.enabled.is_(True),
+                    CalendarSync.token_encrypted.is_not(None),
+                )
+            )
+            rows = r.scalars().all()
+        for stale in set(self.jobs) - {cs.id for cs in rows}:
+            del self.jobs[stale]
+
+        for cs in rows:
+            job = self._job(cs, now)
+            if job["next_run"] > now or cs.id in self._running:
+                continue
+            password = decrypt(cs.token_encrypted)
+            if password is None:
+                job["status"] = "error"
+                job["last_error"] = "Stored credentials cannot be decrypted"
+                job["next_run"] = now + _jitter(self._interval(cs))
+                continue
+            job["status"] = "running"
+            run = sync_jobs.submit(cs, password, sync_horizon())
+            task = self._running[cs.id] = asyncio.create_task(self._follow(cs, run))
+            task.add_done_callback(lambda _, sync_id=cs.id: self._running.pop(sync_id, None))
+
+    async def _follow(self, cs: CalendarSync, run: SyncJob) -> None:
+        """Wait for an account's run and schedule its next one."""
+        await asyncio.wait({run.task})
+        job = self.jobs.get(cs.id)
+        if job is None:
+            return
+        job["last_run"] = run.finished
+        job["last_duration"] = round((run.finished - run.started).total_seconds(), 3)
+        if run.status != "ok":
+            job["failures"] += 1
+            delay = min(BACKOFF_BASE_SECONDS * 2 ** (job["failures"] - 1), BACKOFF_MAX_SECONDS)
+            job.update(status="error", last_error="; ".join(run.errors))
+            job["next_run"] = run.finished + _jitter(delay)
+            log.warning("CalDAV sync %s failed (%d in a row): %s", cs.name, job["failures"], job["last_error"])
+            return
+        job.update(status="ok", failures=0, last_error=None, last_result=run.result)
+        job["next_run"] = run.finished + _jitter(self._interval(cs))
+
+
+scheduler = SyncScheduler()
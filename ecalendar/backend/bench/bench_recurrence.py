@@ -0,0 +1,64 @@
+"""Month-view latency with recurring series, cold vs cached occurrence index.
+
+Run from ecalendar/backend:  python -m bench.bench_recurrence [series]
+Uses a throwaway database under a temporary DATA_DIR.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="ecal-bench-")
+os.environ["SYNC_SCHEDULER"] = "false"
+os.environ["SYNC_LAZY_WINDOW"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app.recurrence import occurrence_index  # noqa: E402
+
+RULES = [
+    "FREQ=DAILY",
+    "FREQ=WEEKLY;BYDAY=MO,WE,FR",
+    "FREQ=WEEKLY;INTERVAL=2;BYDAY=TU",
+    "FREQ=MONTHLY;BYMONTHDAY=1,15",
+    "RRULE:FREQ=WEEKLY;BYDAY=TH\nEXDATE:20260108T090000",
+]
+
+
+def _timed(c: TestClient, params: dict, runs: int) -> tuple[float, int]:
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        n = len(c.get("/api/events", params=params).json())
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000, n
+
+
+def main(series: int = 300, runs: int = 20) -> None:
+    base = datetime(2025, 1, 6, 9, 0)
+    with TestClient(app) as c:
+        for i in range(series):
+            start = base + timedelta(days=i % 28, minutes=15 * (i % 8))
+            c.post("/api/events", json={
+                "title": f"Series {i}",
+                "start": start.isoformat(),
+                "end": (start + timedelta(hours=1)).isoformat(),
+                "recurrence": RULES[i % len(RULES)],
+            })
+        month = {"start": "2026-03-01T00:00:00", "end": "2026-03-31T23:59:59"}
+
+        occurrence_index.invalidate()
+        cold, n = _timed(c, month, 1)
+        warm, _ = _timed(c, month, runs)
+
+        print(f"{series} series, {n} occurrences in month view")
+        print(f"  cold (expand all series):  {cold:8.1f} ms")
+        print(f"  warm (cached occurrences): {warm:8.1f} ms  median of {runs}")
+        print(f"  index hits={occurrence_index.hits} misses={occurrence_index.misses}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
@@ -0,0 +1,98 @@
+"""Latency of large event listings: endpoint, and encoding paths side by side.
+
+Run from ecalendar/backend:  python -m bench.bench_serialize [events]
+Seeds one year of events (10k by default) and times /api/events over the
+whole range, then, in-process on the same rows, ORM objects validated into
+EventRead and re-validated for the response (the old path) against column
+rows encoded with orjson.
+Uses a throwaway database under a temporary DATA_DIR.
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="ecal-bench-")
+os.environ["SYNC_SCHEDULER"] = "false"
+os.environ["SYNC_LAZY_WINDOW"] = "false"
+
+import orjson  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from sqlalchemy import select  # noqa: E402
+
+from app.db import write_queue  # noqa: E402
+from app.db.crud import insert_rows  # noqa: E402
+from app.db.session import read_session  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import Event  # noqa: E402
+from app.schemas import EventRead  # noqa: E402
+
+YEAR = {"start": "2026-01-01T00:00:00", "end": "2026-12-31T23:59:59"}
+
+
+def _median_ms(fn, runs: int) -> float:
+    times = []
+    for _ in range(runs):
+        t = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+async def _seed(n: int) -> None:
+    base = datetime(2026, 1, 1, 8, 0)
+    step = timedelta(days=365) / n
+    rows = [
+        {
+            "title": f"Event {i}",
+            "description": "Bring the notes from last time" if i % 3 == 0 else None,
+            "start": base + i * step,
+            "end": base + i * step + timedelta(hours=1),
+            "all_day": False,
+            "category_id": None,
+        }
+        for i in range(n)
+    ]
+    for i in range(0, n, 1000):
+        await write_queue.run(lambda db, chunk=rows[i:i + 1000]: insert_rows(db, Event, chunk))
+
+
+async def _validated() -> bytes:
+    """ORM objects -> EventRead -> response_model validation -> json.dumps, as FastAPI does."""
+    async with read_session() as db:
+        r = await db.execute(select(Event).order_by(Event.start))
+        events = [EventRead.model_validate(e) for e in r.scalars().all()]
+    adapter = TypeAdapter(list[EventRead])
+    content = adapter.dump_python(adapter.validate_python(events, from_attributes=True), mode="json")
+    return json.dumps(content, ensure_ascii=False, separators=(",", ":")).encode()
+
+
+async def _rows() -> bytes:
+    """Column rows -> dicts -> orjson."""
+    columns = [Event.__table__.c[name] for name in EventRead.model_fields if name in Event.__table__.c]
+    async with read_session() as db:
+        r = await db.execute(select(*columns).order_by(Event.start))
+        return orjson.dumps([row._asdict() for row in r.all()])
+
+
+def main(n: int = 10_000, runs: int = 10) -> None:
+    with TestClient(app) as c:
+        c.portal.call(_seed, n)
+        count = len(c.get("/api/events", params=YEAR).json())
+        print(f"{count} events in a one-year range")
+        ms = _median_ms(lambda: c.get("/api/events", params=YEAR), runs)
+        print(f"  GET /api/events (expanded range)     {ms:8.1f} ms")
+        # Unexpanded listings are paged
+        ms = _median_ms(lambda: c.get("/api/events", params={**YEAR, "expand": False, "limit": 1000}), runs)
+        print(f"  GET /api/events expand=false, 1000   {ms:8.1f} ms")
+        print(f"  validated models + json.dumps       {_median_ms(lambda: c.portal.call(_validated), runs):8.1f} ms")
+        print(f"  column rows + orjson               {_median_ms(lambda: c.portal.call(_rows), runs):8.1f} ms")
+        print(f"  median of {runs}")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000)
@@ -0,0 +1,82 @@
+"""Per-request latency of create/update/delete endpoints, per router.
+
+Run from ecalendar/backend:  python -m bench.bench_writes [requests]
+Requests are sent one at a time, so each pays its own transaction.
+Uses a throwaway database under a temporary DATA_DIR.
+"""
+import os
+import sys
+import tempfile
+import time
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="ecal-bench-")
+os.environ["SYNC_SCHEDULER"] = "false"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+def _median_ms(c: TestClient, calls) -> float:
+    times = []
+    for method, url, body in calls:
+        t = time.perf_counter()
+        r = c.request(method, url, json=body)
+        times.append(time.perf_counter() - t)
+        assert r.status_code < 400, (method, url, r.status_code, r.text)
+    times.sort()
+    return times[len(times) // 2] * 1000
+
+
+def _create(c: TestClient, url: str, body: dict, n: int) -> tuple[float, list[int]]:
+    ids = []
+    times = []
+    for i in range(n):
+        t = time.perf_counter()
+        r = c.post(url, json=body)
+        times.append(time.perf_counter() - t)
+        ids.append(r.json()["id"])
+    times.sort()
+    return times[len(times) // 2] * 1000, ids
+
+
+def main(n: int = 200) -> None:
+    rows = []
+    with TestClient(app) as c:
+        ms, ids = _create(c, "/api/events", {
+            "title": "E", "start": "2026-03-02T09:00:00", "end": "2026-03-02T10:00:00",
+        }, n)
+        rows.append(("events", "POST", ms))
+        rows.append(("events", "PATCH", _median_ms(c, [
+            ("PATCH", f"/api/events/{i}", {"title": "E2"}) for i in ids
+        ])))
+        rows.append(("events", "DELETE", _median_ms(c, [("DELETE", f"/api/events/{i}", None) for i in ids])))
+
+        ms, ids = _create(c, "/api/chores", {"title": "C", "due_date": "2026-03-02"}, n)
+        rows.append(("chores", "POST", ms))
+        rows.append(("chores", "PATCH", _median_ms(c, [
+            ("PATCH", f"/api/chores/{i}", {"completed": True}) for i in ids
+        ])))
+        rows.append(("chores", "DELETE", _median_ms(c, [("DELETE", f"/api/chores/{i}", None) for i in ids])))
+
+        list_id = c.post("/api/lists", json={"title": "L"}).json()["id"]
+        ms, ids = _create(c, f"/api/lists/{list_id}/items", {"title": "I"}, n)
+        rows.append(("lists", "POST", ms))
+        rows.append(("lists", "PATCH", _median_ms(c, [
+            ("PATCH", f"/api/lists/{list_id}/items/{i}", {"completed": True}) for i in ids
+        ])))
+        rows.append(("lists", "DELETE", _median_ms(c, [
+            ("DELETE", f"/api/lists/{list_id}/items/{i}", None) for i in ids
+        ])))
+
+        ms, ids = _create(c, "/api/categories", {"name": "K"}, n)
+        rows.append(("categories", "POST", ms))
+        rows.append(("categories", "DELETE", _median_ms(c, [("DELETE", f"/api/categories/{i}", None) for i in ids])))
+
+    print(f"median latency over {n} sequential requests")
+    for router, method, ms in rows:
+        print(f"  {router:<11} {method:<7} {ms:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 200)
@@ -0,0 +1,17 @@
+import os
+import tempfile
+
+os.environ["DATA_DIR"] = tempfile.mkdtemp(prefix="ecal-test-")
+os.environ["SYNC_SCHEDULER"] = "false"
+os.environ["SYNC_LAZY_WINDOW"] = "false"
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def client():
+    with TestClient(app) as c:
+        yield c
@@ -0,0 +1,131 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from caldav.elements import dav
+from caldav.lib.url import URL
+
+from app.sync import caldav_sync
+from app.sync.caldav_sync import MULTIGET_CHUNK, GetCTag, SyncTokenProp, _fetch_calendar, event_key
+
+ICS = """BEGIN:VCALENDAR
+VERSION:2.0
+BEGIN:VEVENT
+UID:{uid}
+DTSTART:{start:%Y%m%dT%H%M%SZ}
+DTEND:{end:%Y%m%dT%H%M%SZ}
+SUMMARY:Event {uid}
+END:VEVENT
+END:VCALENDAR
+"""
+
+
+class Resource:
+    def __init__(self, url: URL, data: str):
+        self.url = url
+        self.data = data
+
+
+class Listing:
+    def __init__(self, hrefs: list[str]):
+        self.hrefs = hrefs
+
+    def expand_simple_props(self, props):
+        return {href: {} for href in self.hrefs}
+
+
+class FakeCalendar:
+    """A calendar of ``n`` hourly events that records the requests made."""
+
+    def __init__(self, n: int):
+        self.url = URL.objectify("http://dav.example/cal/")
+        base = datetime(2026, 1, 1, 9)
+        self.events = {
+            f"/cal/{i}.ics": ICS.format(uid=f"uid-{i}", start=base + timedelta(hours=i),
+                                        end=base + timedelta(hours=i, minutes=30))
+            for i in range(n)
+        }
+        self.reports = []
+        self.multigets = []
+
+    def get_properties(self, props):
+        return {}
+
+    def _query(self, query, depth, method):
+        self.reports.append(method)
+        return Listing(list(self.events))
+
+    def calendar_multiget(self, urls):
+        self.multigets.append(len(urls))
+        return [Resource(url, self.events[url.path]) for url in urls]
+
+
+def test_full_fetch_lists_then_multigets_in_chunks():
+    calendar = FakeCalendar(MULTIGET_CHUNK * 2 + 50)
+    events, deleted = [], []
+    res = _fetch_calendar(calendar, None, events.append, deleted, (datetime(2025, 1, 1), None))
+
+    assert calendar.reports == ["report"]
+    assert calendar.multigets == [MULTIGET_CHUNK, MULTIGET_CHUNK, 50]
+    assert res["mode"] == "full" and res["fetched"] == len(calendar.events)
+    assert len(events) == len(calendar.events)
+    assert len(res["state"]["hrefs"]) == len(calendar.events)
+
+
+def test_full_fetch_reports_vanished_resources():
+    calendar = FakeCalendar(3)
+    prev = {"hrefs": {"http://dav.example/cal/gone.ics": "uid-gone"}}
+    deleted = []
+    _fetch_calendar(calendar, prev, lambda event: None, deleted)
+    assert deleted == ["uid-gone"]
+
+
+def test_sync_calendar_scopes_keys_and_keeps_bare_uids_in_state(monkeypatch):
+    calendar = FakeCalendar(3)
+    client = SimpleNamespace(calendar=lambda url: calendar)
+    monkeypatch.setattr(caldav_sync, "_client", lambda url, username, password: client)
+    cal_url = str(calendar.url)
+    prev = {"hrefs": {cal_url + "gone.ics": "uid-gone"}}
+    batches = []
+
+    res = caldav_sync._sync_calendar(cal_url, "u", "pw", cal_url, prev, None, batches.append)
+
+    assert [e["external_id"] for batch in batches for e in batch] == [
+        event_key(cal_url, f"uid-{i}") for i in range(3)
+    ]
+    assert sorted(res["state"]["hrefs"].values()) == ["uid-0", "uid-1", "uid-2"]
+    assert res["deleted"] == [event_key(cal_url, "uid-gone")]
+
+
+class ChangedCalendar(FakeCalendar):
+    """FakeCalendar whose ctag moved on and whose sync-collection reports ``changed``."""
+
+    def __init__(self, n: int, changed: list[str]):
+        super().__init__(n)
+        self.changed = changed
+
+    def get_properties(self, props):
+        return {GetCTag.tag: "2", SyncTokenProp.tag: "t2"}
+
+    def objects_by_sync_token(self, sync_token, load_objects):
+        objects = [SimpleNamespace(url=self.url.join(path), props={dav.GetEtag.tag: '"2"'})
+                   for path in self.changed]
+        return SimpleNamespace(objects=objects, sync_token="t2")
+
+
+def test_incremental_change_out_of_window_deletes_the_event():
+    calendar = ChangedCalendar(3, ["/cal/1.ics"])
+    calendar.events["/cal/1.ics"] = ICS.format(uid="uid-1", start=datetime(2030, 1, 1, 9),
+                                               end=datetime(2030, 1, 1, 10))
+    window = (datetime(2025, 12, 1), datetime(2026, 2, 1))
+    prev = {
+        "ctag": "1",
+        "sync_token": "t1",
+        "hrefs": {str(calendar.url.join(path).canonical()): f"uid-{i}" for i, path in enumerate(calendar.events)},
+        "window": window,
+    }
+    events, deleted = [], []
+    res = _fetch_calendar(calendar, prev, events.append, deleted, window)
+
+    assert res["mode"] == "incremental"
+    assert events == [] and deleted == ["uid-1"]
+    assert sorted(res["state"]["hrefs"].values()) == ["uid-0", "uid-2"]
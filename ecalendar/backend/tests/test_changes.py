@@ -0,0 +1,81 @@
+import asyncio
+import json
+
+from app.api import changes as changes_api
+from app.changes import ChangeFeed, change_feed, record
+from app.db.session import async_session
+
+
+async def _take(feed: ChangeFeed, n: int, epoch: str | None = None, since: int | None = None) -> list[dict]:
+    stream = feed.stream(epoch, since, idle=0.01)
+    try:
+        return [await anext(stream) for _ in range(n)]
+    finally:
+        await stream.aclose()
+
+
+def _feed(n: int, max_backlog: int = 10) -> ChangeFeed:
+    feed = ChangeFeed(max_backlog)
+    feed.publish([{"table": "chores", "op": "delete", "ids": [i]} for i in range(n)])
+    return feed
+
+
+def test_new_subscription_starts_with_hello():
+    assert asyncio.run(_take(_feed(3), 1)) == [{"seq": 3, "op": "hello"}]
+
+
+def test_resume_replays_missed_deltas():
+    feed = _feed(5)
+    missed = asyncio.run(_take(feed, 2, feed.epoch, 3))
+    assert [(c["seq"], c["ids"]) for c in missed] == [(4, [3]), (5, [4])]
+
+
+def test_resume_from_unknown_point_resets():
+    feed = _feed(5, max_backlog=2)
+    # Another process, a seq past the end, and one older than the backlog
+    for epoch, since in (("other", 4), (feed.epoch, 9), (feed.epoch, 1)):
+        assert asyncio.run(_take(feed, 1, epoch, since)) == [{"seq": 5, "op": "reset"}]
+
+
+def test_subscriber_that_falls_behind_gets_a_reset():
+    async def run():
+        feed = _feed(0, max_backlog=2)
+        stream = feed.stream(idle=0.01)
+        await anext(stream)
+        feed.publish([{"table": "events", "op": "refresh"}] * 3)
+        try:
+            return await anext(stream), await anext(stream)
+        finally:
+            await stream.aclose()
+
+    change, idle = asyncio.run(run())
+    assert change == {"seq": 3, "op": "reset"} and idle is None
+
+
+async def _record_and(commit: bool) -> int:
+    before = change_feed.seq
+    async with async_session() as db:
+        record(db, "events", "refresh")
+        record(db, "events", "refresh")
+        record(db, "chores", "delete", ids=[1])
+        await (db.commit() if commit else db.rollback())
+    return change_feed.seq - before
+
+
+def test_changes_publish_on_commit_only(client):
+    assert client.portal.call(_record_and, False) == 0
+    # The duplicate refresh is folded into one
+    assert client.portal.call(_record_and, True) == 2
+
+
+def test_stream_resumes_from_last_event_id(client, monkeypatch):
+    monkeypatch.setattr(changes_api, "MAX_STREAM_SECONDS", 0)
+    seq = change_feed.seq
+    cat = client.post("/api/categories", json={"name": "Feed", "color": "#123456"}).json()
+
+    r = client.get("/api/changes", headers={"Last-Event-ID": f"{change_feed.epoch}:{seq}"})
+    event = dict(line.split(": ", 1) for line in r.text.split("\n\n")[1].splitlines())
+    assert event["id"] == f"{change_feed.epoch}:{seq + 1}"
+    change = json.loads(event["data"])
+    assert change["table"] == "categories" and change["op"] == "upsert"
+    assert change["rows"][0]["id"] == cat["id"]
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+
+from app.api.conditional import WATERMARK_LAG
+from app.config import settings
+
+
+def _chore(client, title: str, assignee: str = "etag") -> int:
+    return client.post("/api/chores", json={"title": title, "assignee": assignee}).json()["id"]
+
+
+def test_unchanged_list_is_not_modified(client):
+    r = client.get("/api/chores")
+    tag = r.headers["ETag"]
+    assert client.get("/api/chores", headers={"If-None-Match": tag}).status_code == 304
+
+    _chore(client, "Invalidate")
+    r = client.get("/api/chores", headers={"If-None-Match": tag})
+    assert r.status_code == 200 and r.headers["ETag"] != tag
+
+
+def test_other_tables_keep_the_etag(client):
+    tag = client.get("/api/categories").headers["ETag"]
+    _chore(client, "Elsewhere")
+    assert client.get("/api/categories", headers={"If-None-Match": tag}).status_code == 304
+
+
+def test_updated_since_returns_changes_and_rows_to_drop(client):
+    since = datetime.utcnow() - timedelta(seconds=1)
+    done, gone, new = (_chore(client, title, "delta") for title in ("Done", "Gone", "New"))
+    client.patch(f"/api/chores/{done}", json={"completed": True})
+    client.delete(f"/api/chores/{gone}")
+
+    r = client.get("/api/chores", params={"assignee": "delta", "completed": False,
+                                          "updated_since": since.isoformat()})
+    body = r.json()
+    after = datetime.utcnow()
+    assert [row["id"] for row in body["rows"]] == [new]
+    # Deleted, and changed so it no longer matches completed=false
+    assert {done, gone} <= set(body["deleted"]) and new not in body["deleted"]
+    assert datetime.fromisoformat(body["watermark"]) <= after - WATERMARK_LAG
+
+
+def test_updated_since_older_than_tombstones_is_gone(client):
+    since = datetime.utcnow() - timedelta(days=settings.tombstone_days + 1)
+    r = client.get("/api/events", params={"updated_since": since.isoformat()})
+    assert r.status_code == 410
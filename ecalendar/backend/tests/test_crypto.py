@@ -0,0 +1,37 @@
+import base64
+import hashlib
+import stat
+
+from cryptography.fernet import Fernet
+
+from app.config import settings
+from app.crypto import DEFAULT_SECRET, KEY_FILE, decrypt, encrypt, rotate
+
+
+def _legacy(value: str) -> str:
+    key = base64.urlsafe_b64encode(hashlib.sha256(DEFAULT_SECRET.encode()).digest())
+    return Fernet(key).encrypt(value.encode()).decode()
+
+
+def test_default_secret_uses_private_key_file():
+    token = encrypt("hunter2")
+    assert decrypt(token) == "hunter2"
+    path = settings.data_dir / KEY_FILE
+    assert stat.S_IMODE(path.stat().st_mode) == 0o600
+    assert Fernet(path.read_bytes().strip()).decrypt(token.encode()) == b"hunter2"
+    assert rotate(token) is None
+
+
+def test_legacy_token_is_rotated():
+    token = _legacy("hunter2")
+    assert decrypt(token) == "hunter2"
+    rotated = rotate(token)
+    assert rotated is not None and rotated != token
+    assert decrypt(rotated) == "hunter2"
+    assert rotate(rotated) is None
+
+
+def test_unknown_token():
+    other = Fernet(Fernet.generate_key()).encrypt(b"x").decode()
+    assert decrypt(other) is None
+    assert rotate(other) is None
@@ -0,0 +1,78 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+
+from app.db import write_queue
+from app.models import Event
+from app.sync.importer import UPSERT_CHUNK, delete_events, upsert_events
+
+SOURCE = "import-test:1"
+
+
+def _event(uid: str, title: str | None = None, hour: int = 9) -> dict:
+    start = datetime(2026, 6, 1, hour)
+    return {"title": title or uid, "start": start, "end": start + timedelta(hours=1),
+            "all_day": False, "external_id": uid}
+
+
+async def _import_twice() -> tuple:
+    n = UPSERT_CHUNK * 2 + 5
+    events = [_event(f"bulk-{i}") for i in range(n)]
+
+    async def write(db):
+        first = await upsert_events(db, SOURCE, events)
+        changed = [_event(f"bulk-{i}", "Moved", hour=11) for i in range(0, n, 50)]
+        second = await upsert_events(db, SOURCE, changed + [_event("bulk-new")])
+        count = (await db.execute(select(func.count()).where(Event.source == SOURCE))).scalar_one()
+        moved = (await db.execute(
+            select(func.count()).where(Event.source == SOURCE, Event.title == "Moved")
+        )).scalar_one()
+        return first, second, count, moved
+
+    return await write_queue.run(write)
+
+
+def test_upsert_inserts_across_chunks_then_updates(client):
+    first, second, count, moved = client.portal.call(_import_twice)
+    n = UPSERT_CHUNK * 2 + 5
+    assert first == (n, 0)
+    assert second == (1, len(range(0, n, 50)))
+    assert count == n + 1
+    assert moved == len(range(0, n, 50))
+
+
+async def _batch_with_duplicates() -> tuple:
+    source = "import-test:2"
+
+    async def write(db):
+        counts = await upsert_events(db, source, [
+            _event("dup", "First"), _event("dup", "Second"), {**_event("no-uid"), "external_id": None},
+        ])
+        r = await db.execute(select(Event.external_id, Event.title).where(Event.source == source))
+        return counts, r.all()
+
+    return await write_queue.run(write)
+
+
+def test_upsert_keeps_the_last_duplicate_and_skips_events_without_uid(client):
+    counts, rows = client.portal.call(_batch_with_duplicates)
+    assert counts == (1, 0)
+    assert [tuple(row) for row in rows] == [("dup", "Second")]
+
+
+async def _delete_some() -> tuple:
+    source, other = "import-test:3", "import-test:4"
+
+    async def write(db):
+        await upsert_events(db, source, [_event(f"del-{i}") for i in range(UPSERT_CHUNK + 10)])
+        await upsert_events(db, other, [_event("del-0")])
+        deleted = await delete_events(db, source, [f"del-{i}" for i in range(UPSERT_CHUNK + 5)] + ["missing"])
+        left = (await db.execute(select(func.count()).where(Event.source == source))).scalar_one()
+        kept = (await db.execute(select(func.count()).where(Event.source == other))).scalar_one()
+        return deleted, left, kept
+
+    return await write_queue.run(write)
+
+
+def test_delete_events_counts_rows_removed_from_its_source_only(client):
+    assert client.portal.call(_delete_some) == (UPSERT_CHUNK + 5, 5, 1)
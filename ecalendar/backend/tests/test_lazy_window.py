@@ -0,0 +1,42 @@
+from datetime import datetime
+
+from app.crypto import encrypt
+from app.db import write_queue
+from app.db.crud import insert_row
+from app.models import CalendarSync, CalendarSyncState
+from app.sync.jobs import ensure_window, sync_jobs
+
+
+async def _account(window: tuple[datetime, datetime]) -> int:
+    async def write(db):
+        cs = await insert_row(db, CalendarSync, {
+            "name": "Lazy", "source": "caldav", "url": "http://127.0.0.1:9/", "username": "u",
+            "token_encrypted": encrypt("pw"),
+        })
+        await insert_row(db, CalendarSyncState, {
+            "sync_id": cs.id, "calendar_url": "http://127.0.0.1:9/cal/",
+            "window_start": window[0], "window_end": window[1],
+        })
+        return cs.id
+
+    return await write_queue.run(write)
+
+
+def _jobs(sync_id: int) -> list:
+    return [job for job in sync_jobs.jobs.values() if job.sync_id == sync_id]
+
+
+def test_covered_range_queues_nothing(client):
+    sync_id = client.portal.call(_account, (datetime(2026, 1, 1), datetime(2027, 1, 1)))
+    client.portal.call(ensure_window, datetime(2026, 3, 1), datetime(2026, 4, 1))
+    assert _jobs(sync_id) == []
+
+
+def test_missing_range_is_queued_in_the_background(client):
+    sync_id = client.portal.call(_account, (datetime(2026, 1, 1), datetime(2027, 1, 1)))
+    client.portal.call(ensure_window, datetime(2025, 3, 1), datetime(2025, 4, 1))
+    # Returned without waiting on the (unreachable) server
+    (job,) = _jobs(sync_id)
+    # Further requests while it runs join the same job
+    client.portal.call(ensure_window, datetime(2025, 3, 1), datetime(2025, 4, 1))
+    assert _jobs(sync_id) == [job]
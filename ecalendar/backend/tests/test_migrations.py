@@ -0,0 +1,72 @@
+import json
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND = Path(__file__).resolve().parents[1]
+
+# Tables as the first release created them: no sync state, no indexes
+BASELINE = """
+CREATE TABLE categories (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, color VARCHAR(20) NOT NULL, PRIMARY KEY (id)
+);
+CREATE TABLE calendar_syncs (
+    id INTEGER NOT NULL, name VARCHAR(100) NOT NULL, source VARCHAR(50) NOT NULL, url TEXT,
+    username VARCHAR(255), token_encrypted TEXT, last_sync DATETIME, enabled BOOLEAN NOT NULL,
+    created_at DATETIME NOT NULL, updated_at DATETIME NOT NULL, PRIMARY KEY (id)
+);
+CREATE TABLE events (
+    id INTEGER NOT NULL, title VARCHAR(255) NOT NULL, description TEXT, start DATETIME NOT NULL,
+    "end" DATETIME NOT NULL, all_day BOOLEAN NOT NULL, recurrence VARCHAR(100), category_id INTEGER,
+    external_id VARCHAR(255), source VARCHAR(50), created_at DATETIME NOT NULL,
+    updated_at DATETIME NOT NULL, PRIMARY KEY (id), FOREIGN KEY(category_id) REFERENCES categories (id)
+);
+"""
+
+UPGRADE = """
+import asyncio, json
+import app.models
+from app.db.session import init_db, migrate_online, engine
+from sqlalchemy import text
+
+async def main():
+    await init_db()
+    await migrate_online()
+    async with engine.connect() as conn:
+        events = (await conn.execute(text("SELECT id, source, external_id FROM events ORDER BY id"))).all()
+        tombstones = (await conn.execute(text("SELECT COUNT(*) FROM tombstones"))).scalar()
+        versions = (await conn.execute(text("SELECT version FROM schema_migrations"))).scalars().all()
+    print(json.dumps({"events": [list(e) for e in events], "tombstones": tombstones, "versions": sorted(versions)}))
+
+asyncio.run(main())
+"""
+
+
+def _event(conn, event_id: int, source: str | None, external_id: str | None) -> None:
+    conn.execute(
+        "INSERT INTO events (id, title, start, \"end\", all_day, external_id, source, created_at, updated_at) "
+        "VALUES (?, 'Imported', '2026-03-01 09:00:00', '2026-03-01 10:00:00', 0, ?, ?, "
+        "'2026-01-01 00:00:00', '2026-01-01 00:00:00')",
+        (event_id, external_id, source),
+    )
+
+
+def test_upgrade_from_baseline_keeps_imported_events(tmp_path):
+    with sqlite3.connect(tmp_path / "ecalendar.db") as conn:
+        conn.executescript(BASELINE)
+        _event(conn, 1, "caldav", "uid-a")
+        _event(conn, 2, "caldav", "uid-b")
+        # Imported twice by an older version; the newer row is kept
+        _event(conn, 3, "caldav", "uid-b")
+        _event(conn, 4, None, None)
+
+    out = subprocess.run(
+        [sys.executable, "-c", UPGRADE], cwd=BACKEND, capture_output=True, text=True, check=True,
+        env={"DATA_DIR": str(tmp_path), "SYNC_SCHEDULER": "false", "PATH": ""},
+    )
+    result = json.loads(out.stdout.splitlines()[-1])
+
+    assert result["events"] == [[1, "caldav", "uid-a"], [3, "caldav", "uid-b"], [4, None, None]]
+    assert result["tombstones"] == 0
+    assert result["versions"][:5] == [1, 2, 3, 4, 5]
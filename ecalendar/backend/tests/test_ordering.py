@@ -0,0 +1,104 @@
+from app.db import write_queue
+from app.ordering import RANK_GAP, rebalance
+
+BIG = 3000
+
+
+def make_list(client, n: int, sort_orders: list[int] | None = None) -> tuple[int, list[int]]:
+    """A list of ``n`` items, appended or with the given ranks; returns its id and item ids."""
+    list_id = client.post("/api/lists", json={"title": "Ordering"}).json()["id"]
+    items = [{"title": f"Item {i}"} for i in range(n)]
+    if sort_orders is not None:
+        for item, rank in zip(items, sort_orders):
+            item["sort_order"] = rank
+    r = client.post(f"/api/lists/{list_id}/items/bulk", json=items)
+    assert r.status_code == 201
+    return list_id, [item["id"] for item in r.json()]
+
+
+def items(client, list_id: int) -> list[dict]:
+    return client.get(f"/api/lists/{list_id}/items").json()
+
+
+def move(client, list_id: int, item_id: int, after_id: int | None, order: list[int]) -> dict:
+    """Move through the API and apply the same move to ``order``."""
+    r = client.post(f"/api/lists/{list_id}/items/{item_id}/move", json={"after_id": after_id})
+    assert r.status_code == 200, r.text
+    order.remove(item_id)
+    order.insert(0 if after_id is None else order.index(after_id) + 1, item_id)
+    return r.json()
+
+
+def test_move_writes_only_the_moved_item(client):
+    list_id, order = make_list(client, BIG)
+    before = {item["id"]: item["sort_order"] for item in items(client, list_id)}
+
+    moved = move(client, list_id, order[-1], order[0], order)
+
+    after = {item["id"]: item["sort_order"] for item in items(client, list_id)}
+    assert [item["id"] for item in items(client, list_id)] == order
+    assert before[order[0]] < moved["sort_order"] < before[order[2]]
+    assert {i for i in after if after[i] != before[i]} == {moved["id"]}
+
+
+def test_move_to_top_and_bottom(client):
+    list_id, order = make_list(client, BIG)
+    move(client, list_id, order[1500], None, order)
+    move(client, list_id, order[10], order[-1], order)
+    assert [item["id"] for item in items(client, list_id)] == order
+
+
+def test_repeated_moves_into_one_spot_respace_a_window(client):
+    list_id, order = make_list(client, BIG)
+    before = {item["id"]: item["sort_order"] for item in items(client, list_id)}
+    anchor = order[1000]
+    # Each move halves the gap after the anchor until there is none left
+    for n in range(20):
+        move(client, list_id, order[-1 - n], anchor, order)
+
+    rows = items(client, list_id)
+    assert [item["id"] for item in rows] == order
+    ranks = [item["sort_order"] for item in rows]
+    assert ranks == sorted(ranks) and len(set(ranks)) == len(ranks)
+    changed = [item for item in rows if item["sort_order"] != before[item["id"]]]
+    assert len(changed) < BIG // 10
+
+
+def test_rebalance_keeps_order(client):
+    list_id, order = make_list(client, BIG, [(i * 7) % 5 for i in range(BIG)])
+    expected = [item["id"] for item in items(client, list_id)]
+
+    written = client.portal.call(write_queue.run, lambda db: rebalance(db, list_id))
+
+    rows = items(client, list_id)
+    assert [item["id"] for item in rows] == expected
+    assert [item["sort_order"] for item in rows] == [n * RANK_GAP for n in range(1, BIG + 1)]
+    assert written == BIG
+    assert client.portal.call(write_queue.run, lambda db: rebalance(db, list_id)) == 0
+
+
+def test_move_between_tied_ranks(client):
+    # Lists from before gapped ranks: every item at 0, ordered by id
+    list_id, order = make_list(client, BIG, [0] * BIG)
+    move(client, list_id, order[-1], order[100], order)
+    move(client, list_id, order[5], None, order)
+    move(client, list_id, order[2000], order[2001], order)
+    assert [item["id"] for item in items(client, list_id)] == order
+
+
+def test_move_after_unknown_item_is_404(client):
+    list_id, order = make_list(client, 3)
+    r = client.post(f"/api/lists/{list_id}/items/{order[0]}/move", json={"after_id": order[-1] + 1000})
+    assert r.status_code == 404
+    other_list, other = make_list(client, 1)
+    r = client.post(f"/api/lists/{list_id}/items/{order[0]}/move", json={"after_id": other[0]})
+    assert r.status_code == 404
+    r = client.post(f"/api/lists/{other_list}/items/{order[0]}/move", json={"after_id": None})
+    assert r.status_code == 404
+
+
+def test_move_after_itself_is_400(client):
+    list_id, order = make_list(client, 3)
+    r = client.post(f"/api/lists/{list_id}/items/{order[1]}/move", json={"after_id": order[1]})
+    assert r.status_code == 400
+    assert [item["id"] for item in items(client, list_id)] == order
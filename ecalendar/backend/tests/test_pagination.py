@@ -0,0 +1,49 @@
+from datetime import date, datetime, timedelta
+
+from app.api.pagination import NEXT_CURSOR, encode_cursor
+
+
+def _walk(client, path: str, params: dict) -> tuple[list[dict], int]:
+    rows, pages, cursor = [], 0, None
+    while True:
+        r = client.get(path, params={**params, **({"cursor": cursor} if cursor else {})})
+        assert r.status_code == 200
+        rows += r.json()
+        pages += 1
+        cursor = r.headers.get(NEXT_CURSOR)
+        if not cursor:
+            return rows, pages
+
+
+def test_event_pages_follow_start_then_id(client):
+    base = datetime(2099, 3, 1, 9)
+    for offset in (2, 0, 0, 1, 0):
+        start = base + timedelta(hours=offset)
+        client.post("/api/events", json={"title": f"Page {offset}", "start": start.isoformat(),
+                                         "end": (start + timedelta(minutes=30)).isoformat()})
+
+    window = {"start": "2099-03-01T00:00:00", "end": "2099-03-02T00:00:00", "expand": False}
+    rows, pages = _walk(client, "/api/events", {**window, "limit": 2})
+    keys = [(row["start"], row["id"]) for row in rows]
+    assert pages == 3 and len(keys) == 5
+    assert keys == sorted(keys)
+
+
+def test_chore_pages_put_undated_last(client):
+    due = date(2099, 3, 1)
+    for title, day in (("Later", due + timedelta(days=1)), ("None 1", None), ("Same 1", due),
+                       ("None 2", None), ("Same 2", due)):
+        client.post("/api/chores", json={"title": title, "assignee": "pages",
+                                         "due_date": day.isoformat() if day else None})
+
+    rows, pages = _walk(client, "/api/chores", {"assignee": "pages", "limit": 2})
+    assert pages == 3
+    # Newest first within a due date and among undated chores
+    assert [row["title"] for row in rows] == ["Same 2", "Same 1", "Later", "None 2", "None 1"]
+    assert rows == client.get("/api/chores", params={"assignee": "pages"}).json()
+
+
+def test_malformed_cursor_is_rejected(client):
+    for path, cursor in (("/api/events", "not-a-cursor"), ("/api/events", encode_cursor("2099-03-01T09:00:00")),
+                         ("/api/chores", encode_cursor(None, "2099-03-01T09:00:00", "1"))):
+        assert client.get(path, params={"cursor": cursor}).status_code == 400
@@ -0,0 +1,50 @@
+from datetime import datetime, timedelta
+from types import SimpleNamespace
+
+from dateutil.rrule import rrulestr
+
+from app.recurrence import MAX_OCCURRENCES, OccurrenceIndex
+
+START = datetime(2026, 1, 1, 0, 0)
+# Far more than MAX_OCCURRENCES in a month
+DENSE = "FREQ=MINUTELY;INTERVAL=15"
+
+
+def _series(recurrence: str):
+    return SimpleNamespace(id=1, recurrence=recurrence, start=START,
+                           end=START + timedelta(minutes=10), updated_at=START)
+
+
+def _expected(recurrence: str, lo: datetime, hi: datetime) -> list[datetime]:
+    return rrulestr(recurrence, dtstart=START).between(lo - timedelta(minutes=10), hi, inc=True)
+
+
+def test_truncated_series_is_only_cached_as_far_as_produced():
+    index = OccurrenceIndex()
+    event = _series(DENSE)
+    lo, hi = START, START + timedelta(days=2)
+    assert index.occurrences(event, lo, hi) == _expected(DENSE, lo, hi)
+
+    # The month's expansion stopped at MAX_OCCURRENCES, well before this
+    lo, hi = START + timedelta(days=20), START + timedelta(days=21)
+    assert index.occurrences(event, lo, hi) == _expected(DENSE, lo, hi)
+
+
+def test_view_is_capped_at_max_occurrences():
+    index = OccurrenceIndex()
+    event = _series(DENSE)
+    lo, hi = START, START + timedelta(days=60)
+    assert index.occurrences(event, lo, hi) == _expected(DENSE, lo, hi)[:MAX_OCCURRENCES]
+    # Served again from the cache
+    assert len(index.occurrences(event, lo, hi)) == MAX_OCCURRENCES
+    assert index.hits == 1
+
+
+def test_cached_series_is_reused():
+    index = OccurrenceIndex()
+    event = _series("FREQ=DAILY")
+    index.occurrences(event, START, START + timedelta(days=20))
+    assert index.occurrences(event, START + timedelta(days=3), START + timedelta(days=5)) == [
+        START + timedelta(days=d) for d in (3, 4, 5)
+    ]
+    assert (index.hits, index.misses) == (1, 1)
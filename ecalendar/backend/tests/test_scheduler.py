@@ -0,0 +1,76 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from app.crypto import encrypt
+from app.db import write_queue
+from app.db.crud import insert_row
+from app.models import CalendarSync
+from app.sync import scheduler as scheduler_module
+from app.sync.jobs import SyncJob
+from app.sync.scheduler import SyncScheduler
+
+
+class FakeJobs:
+    """Stands in for sync_jobs; runs finish when their account's event is set."""
+
+    def __init__(self):
+        self.release: dict[int, asyncio.Event] = {}
+        self.submitted: list[int] = []
+
+    def submit(self, cs, password, window):
+        self.submitted.append(cs.id)
+        job = SyncJob(cs.id, cs.name)
+        release = self.release.setdefault(cs.id, asyncio.Event())
+
+        async def run():
+            await release.wait()
+            job.status = "ok"
+            job.result = {}
+            job.finished = datetime.utcnow()
+
+        job.task = asyncio.create_task(run())
+        return job
+
+
+async def _accounts(n: int) -> list[int]:
+    async def write(db):
+        return [
+            (await insert_row(db, CalendarSync, {
+                "name": f"Account {i}", "source": "caldav", "url": "http://127.0.0.1:9/",
+                "username": "u", "token_encrypted": encrypt("pw"),
+            })).id
+            for i in range(n)
+        ]
+
+    return await write_queue.run(write)
+
+
+def test_slow_account_does_not_hold_up_the_others(client, monkeypatch):
+    slow, fast = client.portal.call(_accounts, 2)
+    jobs = FakeJobs()
+    monkeypatch.setattr(scheduler_module, "sync_jobs", jobs)
+    scheduler = SyncScheduler()
+    later = datetime.utcnow() + timedelta(days=1)
+
+    async def scenario():
+        jobs.release[fast] = asyncio.Event()
+        jobs.release[fast].set()
+        # New accounts are first due within a tick
+        await scheduler.tick(later)
+        # Returns without waiting for either run
+        await asyncio.wait_for(scheduler.tick(later + timedelta(minutes=1)), 5)
+        await asyncio.sleep(0.05)
+        assert scheduler.jobs[fast]["status"] == "ok"
+        assert scheduler.jobs[slow]["status"] == "running"
+
+        # Both due again: only the idle account is started
+        await scheduler.tick(later + timedelta(days=1))
+        assert jobs.submitted.count(fast) == 2
+        assert jobs.submitted.count(slow) == 1
+
+        jobs.release[slow].set()
+        await asyncio.sleep(0.05)
+        assert scheduler.jobs[slow]["status"] == "ok"
+        await scheduler.stop()
+
+    client.portal.call(scenario)
@@ -0,0 +1,167 @@
+import json
+from datetime import datetime
+
+from sqlalchemy import select
+
+from app.db import write_queue
+from app.db.migrations import scope_caldav_event_keys
+from app.db.session import async_session, engine
+from app.models import CalendarSync, CalendarSyncState, Event, Tombstone
+from app.sync.caldav_sync import event_key
+from app.sync import importer
+from app.sync.importer import caldav_source, delete_events, import_caldav, upsert_events
+
+CAL_A = "https://dav.example/a/"
+CAL_B = "https://dav.example/b/"
+
+
+def _event(uid: str) -> dict:
+    return {"title": uid, "start": datetime(2026, 5, 1, 9), "end": datetime(2026, 5, 1, 10),
+            "all_day": False, "external_id": uid}
+
+
+async def _legacy_rows() -> tuple[int, int, int]:
+    async def write(db):
+        cs = CalendarSync(name="Legacy", source="caldav")
+        db.add(cs)
+        await db.flush()
+        a = CalendarSyncState(sync_id=cs.id, calendar_url=CAL_A, ctag="a", sync_token="a",
+                              hrefs=json.dumps({CAL_A + "1.ics": "shared", CAL_A + "2.ics": "only-a"}))
+        b = CalendarSyncState(sync_id=cs.id, calendar_url=CAL_B, ctag="b", sync_token="b",
+                              hrefs=json.dumps({CAL_B + "1.ics": "shared"}))
+        db.add_all([a, b])
+        await upsert_events(db, "caldav", [_event("shared"), _event("only-a"), _event("orphan")])
+        await db.flush()
+        return cs.id, a.id, b.id
+
+    return await write_queue.run(write)
+
+
+async def _rows():
+    async with engine.connect() as conn:
+        events = (await conn.execute(
+            select(Event.source, Event.external_id).where(Event.source.like("caldav%"))
+        )).all()
+        states = (await conn.execute(select(CalendarSyncState.id, CalendarSyncState.ctag))).all()
+        tombstones = (await conn.execute(select(Tombstone.row_id).where(Tombstone.table_name == "events"))).all()
+    return set(events), dict(states), len(tombstones)
+
+
+def test_legacy_keys_are_scoped_per_account_and_calendar(client):
+    sync_id, a, b = client.portal.call(_legacy_rows)
+    _, _, tombstones = client.portal.call(_rows)
+
+    client.portal.call(scope_caldav_event_keys, engine)
+
+    events, states, after = client.portal.call(_rows)
+    source = caldav_source(sync_id)
+    assert events == {
+        (source, event_key(CAL_A, "shared")), (source, event_key(CAL_A, "only-a")), ("caldav", "orphan"),
+    }
+    # B lost the shared row to A and is refetched; A keeps its markers
+    assert states[a] == "a" and states[b] is None
+    # Unclaimed rows are kept for their account's next sync
+    assert after == tombstones
+
+
+async def _shared_uid_in_two_accounts() -> list[str]:
+    async def write(db):
+        await upsert_events(db, caldav_source(101), [_event(event_key(CAL_A, "same"))])
+        await upsert_events(db, caldav_source(102), [_event(event_key(CAL_A, "same"))])
+        await delete_events(db, caldav_source(101), [event_key(CAL_A, "same")])
+        r = await db.execute(select(Event.source).where(Event.external_id == event_key(CAL_A, "same")))
+        return r.scalars().all()
+
+    return await write_queue.run(write)
+
+
+def test_deletion_in_one_account_keeps_the_other(client):
+    assert client.portal.call(_shared_uid_in_two_accounts) == [caldav_source(102)]
+
+
+async def _resync(changes: dict) -> tuple[tuple[int, int], tuple[int, int], list]:
+    source = caldav_source(201)
+    events = [_event(event_key(CAL_A, f"resync-{i}")) for i in range(3)]
+
+    async def write(db):
+        first = await upsert_events(db, source, events)
+        before = (await db.execute(select(Event.external_id, Event.updated_at).where(Event.source == source))).all()
+        second = await upsert_events(db, source, [{**events[0], **changes}, *events[1:]])
+        after = (await db.execute(select(Event.external_id, Event.updated_at).where(Event.source == source))).all()
+        return first, second, [key for key, stamp in dict(after).items() if dict(before)[key] != stamp]
+
+    return await write_queue.run(write)
+
+
+def test_upsert_rewrites_only_changed_rows(client):
+    first, second, touched = client.portal.call(_resync, {"title": "Renamed"})
+    assert first == (3, 0)
+    assert second == (0, 1)
+    assert touched == [event_key(CAL_A, "resync-0")]
+
+
+async def _sync_upgraded_account() -> tuple[int, int, list]:
+    async def seed(db):
+        cs = CalendarSync(name="Upgraded", source="caldav", url="https://dav.example/", username="u")
+        db.add(cs)
+        await upsert_events(db, "caldav", [_event("adopt-me")])
+        await db.flush()
+        r = await db.execute(select(Event.id).where(Event.external_id == "adopt-me"))
+        return cs.id, r.scalar_one()
+
+    sync_id, legacy_id = await write_queue.run(seed)
+    async with async_session() as db:
+        cs = await db.get(CalendarSync, sync_id)
+        await import_caldav(db, cs, "pw", commit=True)
+    async with engine.connect() as conn:
+        r = await conn.execute(
+            select(Event.id, Event.source, Event.external_id).where(Event.external_id.like("%adopt-me"))
+        )
+        return sync_id, legacy_id, r.all()
+
+
+def test_next_sync_rekeys_legacy_rows_in_place(client, monkeypatch):
+    async def fetch(url, username, password, state, window, progress, on_batch):
+        await on_batch([_event(event_key(CAL_A, "adopt-me"))])
+        return {"deleted": [], "state": {}, "stats": {}, "errors": []}
+
+    monkeypatch.setattr(importer, "sync_caldav", fetch)
+    sync_id, legacy_id, rows = client.portal.call(_sync_upgraded_account)
+    assert [tuple(row) for row in rows] == [(legacy_id, caldav_source(sync_id), event_key(CAL_A, "adopt-me"))]
+
+
+async def _sync_after_calendar_removed() -> tuple[dict, set, int, list]:
+    async def seed(db):
+        cs = CalendarSync(name="Shrunk", source="caldav", url="https://dav.example/", username="u")
+        db.add(cs)
+        await db.flush()
+        db.add_all([CalendarSyncState(sync_id=cs.id, calendar_url=url, hrefs="{}") for url in (CAL_A, CAL_B)])
+        await upsert_events(db, caldav_source(cs.id), [
+            _event(event_key(CAL_A, "kept")), _event(event_key(CAL_B, "gone")),
+        ])
+        # Same calendar URL under another account is not touched
+        await upsert_events(db, caldav_source(cs.id + 1000), [_event(event_key(CAL_B, "other"))])
+        return cs.id
+
+    sync_id = await write_queue.run(seed)
+    _, _, tombstones = await _rows()
+    async with async_session() as db:
+        cs = await db.get(CalendarSync, sync_id)
+        result = await import_caldav(db, cs, "pw", commit=True)
+    events, _, after = await _rows()
+    async with engine.connect() as conn:
+        r = await conn.execute(select(CalendarSyncState.calendar_url).where(CalendarSyncState.sync_id == sync_id))
+        states = r.scalars().all()
+    return result, {key for source, key in events if source != "caldav"}, after - tombstones, states
+
+
+def test_vanished_calendar_takes_its_events(client, monkeypatch):
+    async def fetch(url, username, password, state, window, progress, on_batch):
+        return {"deleted": [], "state": {CAL_A: state[CAL_A]}, "stats": {}, "errors": []}
+
+    monkeypatch.setattr(importer, "sync_caldav", fetch)
+    result, keys, tombstones, states = client.portal.call(_sync_after_calendar_removed)
+    assert result["deleted"] == 1 and tombstones == 1
+    assert event_key(CAL_B, "gone") not in keys
+    assert {event_key(CAL_A, "kept"), event_key(CAL_B, "other")} <= keys
+    assert states == [CAL_A]
@@ -1,26 +1,47 @@
+import { useEffect, useState } from "react";
+import { endOfMonth, startOfMonth } from "date-fns";
 import { Calendar } from "./components/Calendar";
 import { Chores } from "./components/Chores";
 import { TodoLists } from "./components/TodoLists";
 import { Weather } from "./components/Weather";
+import { dashboardApi } from "./api";
+import type { Dashboard } from "./api";
+
+const CITY = "London";
 
 function App() {
+  // undefined while loading; null if the dashboard failed and each panel loads its own data
+  const [dash, setDash] = useState<Dashboard | null | undefined>(undefined);
+
+  useEffect(() => {
+    const now = new Date();
+    dashboardApi
+      .get(startOfMonth(now).toISOString(), endOfMonth(now).toISOString(), CITY)
+      .then(setDash)
+      .catch(() => setDash(null));
+  }, []);
+
   return (
     <div className="min-h-screen bg-slate-50 dark:bg-slate-900 text-slate-900 dark:text-slate-100">
       <header className="border-b border-slate-200 dark:border-slate-700 px-4 py-3">
         <h1 className="text-xl font-bold">eCalendar</h1>
       </header>
 
-      <main className="grid grid-cols-1 lg:grid-cols-3 gap-6 p-4">
-        <section className="lg:col-span-2">
-          <Calendar />
-        </section>
+      {dash === undefined ? (
+        <div className="p-4">Loading...</div>
+      ) : (
+        <main className="grid grid-cols-1 lg:grid-cols-3 gap-6 p-4">
+          <section className="lg:col-span-2">
+            <Calendar initial={dash?.events} />
+          </section>
 
-        <aside className="space-y-6">
-          <Weather city="London" />
-          <Chores />
-          <TodoLists />
-        </aside>
-      </main>
+          <aside className="space-y-6">
+            <Weather city={CITY} initial={dash?.weather ?? undefined} />
+            <Chores initial={dash?.chores} />
+            <TodoLists initial={dash?.lists} />
+          </aside>
+        </main>
+      )}
     </div>
   );
 }
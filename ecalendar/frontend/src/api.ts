@@ -37,6 +37,38 @@ export type TodoItem = {
   sort_order: number;
 };
 
+export type HourlyForecast = {
+  time: string;
+  temp: number;
+  description: string;
+  icon: string;
+  precipitation_probability: number | null;
+  wind_speed: number;
+};
+
+export type DailyForecast = {
+  date: string;
+  temp_max: number;
+  temp_min: number;
+  description: string;
+  icon: string;
+  precipitation_sum: number | null;
+  precipitation_probability: number | null;
+};
+
+export type LocationForecast = {
+  lat: number;
+  lon: number;
+  timezone: string;
+  current: Weather;
+  hourly: HourlyForecast[];
+  daily: DailyForecast[];
+};
+
+export type TodoListWithItems = TodoList & { items: TodoItem[] };
+
+export type TodoListWithCounts = TodoList & { open_count: number; done_count: number };
+
 export type Category = {
   id: number;
   name: string;
@@ -53,6 +85,22 @@ export type Weather = {
   city: string;
 };
 
+export type Dashboard = {
+  events: Event[];
+  chores: Chore[];
+  lists: TodoListWithItems[];
+  categories: Category[];
+  weather: Weather | null;
+};
+
+export type Change = {
+  seq: number;
+  op: "upsert" | "delete" | "refresh" | "reset" | "hello";
+  table?: string;
+  rows?: unknown[];
+  ids?: number[];
+};
+
 async function req<T>(path: string, opts?: RequestInit): Promise<T> {
   const r = await fetch(API + path, {
     ...opts,
@@ -63,6 +111,15 @@ async function req<T>(path: string, opts?: RequestInit): Promise<T> {
   return r.json();
 }
 
+export type Page<T> = { items: T[]; next: string | null };
+
+// Paginated listings send the next page's cursor in a header
+async function reqPage<T>(path: string): Promise<Page<T>> {
+  const r = await fetch(API + path);
+  if (!r.ok) throw new Error(await r.text());
+  return { items: await r.json(), next: r.headers.get("X-Next-Cursor") };
+}
+
 export const eventsApi = {
   list: (start?: string, end?: string) => {
     const p = new URLSearchParams();
@@ -77,11 +134,12 @@ export const eventsApi = {
 };
 
 export const choresApi = {
-  list: (params?: { completed?: boolean; assignee?: string }) => {
+  list: (params?: { completed?: boolean; assignee?: string; cursor?: string }) => {
     const p = new URLSearchParams();
     if (params?.completed != null) p.set("completed", String(params.completed));
     if (params?.assignee) p.set("assignee", params.assignee);
-    return req<Chore[]>(`/chores${p.toString() ? "?" + p : ""}`);
+    if (params?.cursor) p.set("cursor", params.cursor);
+    return reqPage<Chore>(`/chores${p.toString() ? "?" + p : ""}`);
   },
   create: (c: Partial<Chore>) => req<Chore>("/chores", { method: "POST", body: JSON.stringify(c) }),
   get: (id: number) => req<Chore>(`/chores/${id}`),
@@ -91,11 +149,15 @@ export const choresApi = {
 
 export const listsApi = {
   list: () => req<TodoList[]>("/lists"),
+  listWithItems: () => req<TodoListWithItems[]>("/lists?include=items"),
+  listWithCounts: () => req<TodoListWithCounts[]>("/lists?include=counts"),
   create: (l: Partial<TodoList>) => req<TodoList>("/lists", { method: "POST", body: JSON.stringify(l) }),
   delete: (id: number) => req<void>(`/lists/${id}`, { method: "DELETE" }),
   items: (listId: number) => req<TodoItem[]>(`/lists/${listId}/items`),
-  addItem: (listId: number, title: string, sortOrder = 0) =>
+  addItem: (listId: number, title: string, sortOrder?: number) =>
     req<TodoItem>(`/lists/${listId}/items`, { method: "POST", body: JSON.stringify({ title, sort_order: sortOrder }) }),
+  moveItem: (listId: number, itemId: number, afterId: number | null) =>
+    req<TodoItem>(`/lists/${listId}/items/${itemId}/move`, { method: "POST", body: JSON.stringify({ after_id: afterId }) }),
   updateItem: (listId: number, itemId: number, u: Partial<TodoItem>) =>
     req<TodoItem>(`/lists/${listId}/items/${itemId}`, { method: "PATCH", body: JSON.stringify(u) }),
   deleteItem: (listId: number, itemId: number) =>
@@ -116,4 +178,48 @@ export const weatherApi = {
     if (lon != null) p.set("lon", String(lon));
     return req<Weather>(`/weather?${p}`);
   },
+  forecast: (locations: { lat: number; lon: number; name?: string }[], days = 7) => {
+    const p = new URLSearchParams({ days: String(days) });
+    for (const l of locations) {
+      p.append("lat", String(l.lat));
+      p.append("lon", String(l.lon));
+    }
+    if (locations.every((l) => l.name)) locations.forEach((l) => p.append("name", l.name!));
+    return req<LocationForecast[]>(`/weather/forecast?${p}`);
+  },
 };
+
+export const dashboardApi = {
+  get: (start: string, end: string, city?: string) => {
+    const p = new URLSearchParams({ start, end });
+    if (city) p.set("city", city);
+    return req<Dashboard>(`/dashboard?${p}`);
+  },
+};
+
+// One EventSource shared by all subscribers; it reconnects on its own and
+// resumes from the last event id it saw.
+const changeListeners = new Set<(c: Change) => void>();
+let changeSource: EventSource | null = null;
+
+export function subscribeChanges(fn: (c: Change) => void): () => void {
+  changeListeners.add(fn);
+  if (!changeSource) {
+    changeSource = new EventSource(API + "/changes");
+    changeSource.onmessage = (e) => {
+      const c: Change = JSON.parse(e.data);
+      changeListeners.forEach((l) => l(c));
+    };
+  }
+  return () => {
+    changeListeners.delete(fn);
+    if (!changeListeners.size) {
+      changeSource?.close();
+      changeSource = null;
+    }
+  };
+}
+
+// True when a change means data from ``tables`` must be fetched again
+export const touches = (c: Change, ...tables: string[]) =>
+  c.op === "reset" || (c.table != null && tables.includes(c.table));
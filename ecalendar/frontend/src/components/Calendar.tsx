@@ -1,4 +1,4 @@
-import { useEffect, useState } from "react";
+import { useEffect, useRef, useState } from "react";
 import {
   format,
   startOfMonth,
@@ -12,12 +12,14 @@ import {
   isSameDay,
   parseISO,
 } from "date-fns";
-import { eventsApi } from "../api";
+import { eventsApi, subscribeChanges, touches } from "../api";
 import type { Event } from "../api";
 
-export function Calendar() {
+export function Calendar({ initial }: { initial?: Event[] }) {
   const [month, setMonth] = useState(new Date());
-  const [events, setEvents] = useState<Event[]>([]);
+  const [events, setEvents] = useState<Event[]>(initial ?? []);
+  // The current month came with the dashboard
+  const preloaded = useRef(initial != null);
   const [selected, setSelected] = useState<Date | null>(null);
   const [detail, setDetail] = useState<Event | null>(null);
 
@@ -27,9 +29,21 @@ export function Calendar() {
   const endCal = endOfWeek(end);
 
   useEffect(() => {
+    if (preloaded.current) {
+      preloaded.current = false;
+      return;
+    }
     eventsApi.list(start.toISOString(), end.toISOString()).then(setEvents);
   }, [month]);
 
+  useEffect(
+    () =>
+      subscribeChanges((c) => {
+        if (touches(c, "events")) eventsApi.list(start.toISOString(), end.toISOString()).then(setEvents);
+      }),
+    [month]
+  );
+
   const days: Date[] = [];
   let d = startCal;
   while (d <= endCal) {
@@ -1,19 +1,55 @@
-import { useEffect, useState } from "react";
-import { choresApi } from "../api";
+import { useEffect, useRef, useState } from "react";
+import { choresApi, subscribeChanges, touches } from "../api";
 import type { Chore } from "../api";
 import { format } from "date-fns";
 
-export function Chores() {
-  const [chores, setChores] = useState<Chore[]>([]);
-  const [loading, setLoading] = useState(true);
+export function Chores({ initial }: { initial?: Chore[] }) {
+  const [chores, setChores] = useState<Chore[]>(initial ?? []);
+  const [loading, setLoading] = useState(initial == null);
+  const preloaded = useRef(initial != null);
   const [showCompleted, setShowCompleted] = useState(false);
+  const [next, setNext] = useState<string | null>(null);
+  // Pages shown; a reload refetches as many so "Show more" is kept
+  const depth = useRef(1);
 
-  const load = () => choresApi.list({ completed: showCompleted ? undefined : false }).then(setChores).finally(() => setLoading(false));
+  const filter = () => ({ completed: showCompleted ? undefined : false });
+
+  const load = async () => {
+    try {
+      const items: Chore[] = [];
+      let cursor: string | undefined;
+      for (let i = 0; i < depth.current; i++) {
+        const page = await choresApi.list({ ...filter(), cursor });
+        items.push(...page.items);
+        cursor = page.next ?? undefined;
+        if (!cursor) break;
+      }
+      setChores(items);
+      setNext(cursor ?? null);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  const more = async () => {
+    if (!next) return;
+    const page = await choresApi.list({ ...filter(), cursor: next });
+    depth.current += 1;
+    setChores((cs) => [...cs, ...page.items]);
+    setNext(page.next);
+  };
 
   useEffect(() => {
+    depth.current = 1;
+    if (preloaded.current) {
+      preloaded.current = false;
+      return;
+    }
     load();
   }, [showCompleted]);
 
+  useEffect(() => subscribeChanges((c) => touches(c, "chores") && load()), [showCompleted]);
+
   const toggle = async (c: Chore) => {
     await choresApi.update(c.id, { completed: !c.completed });
     load();
@@ -74,6 +110,11 @@ export function Chores() {
           </li>
         ))}
       </ul>
+      {next && (
+        <button onClick={more} className="mt-2 text-sm text-indigo-600 hover:underline">
+          Show more
+        </button>
+      )}
     </div>
   );
 }
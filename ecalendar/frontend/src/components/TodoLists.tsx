@@ -1,26 +1,33 @@
 import { useEffect, useState } from "react";
-import { listsApi } from "../api";
-import type { TodoList, TodoItem } from "../api";
+import { listsApi, subscribeChanges, touches } from "../api";
+import type { TodoList, TodoItem, TodoListWithItems } from "../api";
 
-export function TodoLists() {
-  const [lists, setLists] = useState<TodoList[]>([]);
-  const [items, setItems] = useState<Record<number, TodoItem[]>>({});
-  const [selected, setSelected] = useState<number | null>(null);
-  const [loading, setLoading] = useState(true);
+export function TodoLists({ initial }: { initial?: TodoListWithItems[] }) {
+  const [lists, setLists] = useState<TodoList[]>(initial ?? []);
+  const [items, setItems] = useState<Record<number, TodoItem[]>>(
+    () => Object.fromEntries((initial ?? []).map((l) => [l.id, l.items]))
+  );
+  const [selected, setSelected] = useState<number | null>(initial?.length ? initial[0].id : null);
+  const [loading, setLoading] = useState(initial == null);
 
   const loadLists = () =>
-    listsApi.list().then((l) => {
+    listsApi.listWithItems().then((l) => {
       setLists(l);
+      setItems(Object.fromEntries(l.map((x) => [x.id, x.items])));
       setSelected((prev) => (l.length && !prev ? l[0].id : prev));
     });
   const loadItems = (id: number) => listsApi.items(id).then((i) => setItems((prev) => ({ ...prev, [id]: i })));
 
   useEffect(() => {
-    loadLists().finally(() => setLoading(false));
+    // Lists and their items may have come with the dashboard
+    if (initial == null) loadLists().finally(() => setLoading(false));
   }, []);
 
+  useEffect(() => subscribeChanges((c) => touches(c, "todo_lists", "todo_items") && loadLists()), []);
+
   useEffect(() => {
-    if (selected) loadItems(selected);
+    // Items of every list arrive with the lists; only new lists need a fetch
+    if (selected && !(selected in items)) loadItems(selected);
   }, [selected]);
 
   const addList = async () => {
@@ -2,11 +2,12 @@ import { useEffect, useState } from "react";
 import { weatherApi } from "../api";
 import type { Weather as WeatherType } from "../api";
 
-export function Weather({ city = "London" }: { city?: string }) {
-  const [w, setW] = useState<WeatherType | null>(null);
+export function Weather({ city = "London", initial }: { city?: string; initial?: WeatherType }) {
+  const [w, setW] = useState<WeatherType | null>(initial ?? null);
   const [err, setErr] = useState<string | null>(null);
 
   useEffect(() => {
+    if (initial && initial.city === city) return;
     weatherApi.get(city).then(setW).catch((e) => setErr(e.message));
   }, [city]);
 